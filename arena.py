@@ -0,0 +1,147 @@
+from array import array
+from typing import Dict, Iterable, Iterator
+
+
+class ClauseArena:
+    """
+    Flat clause store. Every clause lives in a single int32 array as a
+    header followed by its literals, and is referenced by the offset of its
+    header (a "cref").
+
+        data[cref + SIZE]   number of literals
+        data[cref + FLAGS]  LEARNT / DELETED / UNWATCHED bits
+        data[cref + LBD]    literal block distance, 0 for original clauses
+        data[cref + USED]   last conflict in which the clause took part
+        data[cref + HEADER: cref + HEADER + size]  the literals
+
+    Deleted clauses stay in place until compact() reclaims their space.
+    UNWATCHED marks learnt clauses kept only as reasons of another
+    propagator, which are in no watch list.
+    """
+
+    __slots__ = ("data", "num_variables", "num_clauses", "wasted")
+
+    SIZE = 0
+    FLAGS = 1
+    LBD = 2
+    USED = 3
+    HEADER = 4
+
+    LEARNT = 1
+    DELETED = 2
+    UNWATCHED = 4
+
+    def __init__(self):
+        self.data = array("i")
+        self.num_variables = 0
+        self.num_clauses = 0
+        # number of ints taken by deleted clauses
+        self.wasted = 0
+
+    def add(self, literals: Iterable[int], learnt: bool = False, lbd: int = 0) -> int:
+        """
+        Append a clause and return its cref.
+        """
+        data = self.data
+        cref = len(data)
+        data.extend((0, self.LEARNT if learnt else 0, lbd, 0))
+        data.extend(literals)
+        size = len(data) - cref - self.HEADER
+        data[cref] = size
+
+        if size > 0:
+            start = cref + self.HEADER
+            largest = max(max(data[start:]), -min(data[start:]))
+            if largest > self.num_variables:
+                self.num_variables = largest
+        self.num_clauses += 1
+        return cref
+
+    def extend(self, clauses: Iterable[array]):
+        """
+        Append many original clauses at once, as the parser does.
+        """
+        data = self.data
+        first = len(data)
+        for literals in clauses:
+            data.extend((len(literals), 0, 0, 0))
+            data.extend(literals)
+            self.num_clauses += 1
+
+        # header fields are small non-negative values, literals dominate
+        if len(data) > first:
+            largest = max(max(data[first:]), -min(data[first:]))
+            if largest > self.num_variables:
+                self.num_variables = largest
+
+    def size(self, cref: int) -> int:
+        return self.data[cref]
+
+    def learnt(self, cref: int) -> bool:
+        return self.data[cref + self.FLAGS] & self.LEARNT != 0
+
+    def deleted(self, cref: int) -> bool:
+        return self.data[cref + self.FLAGS] & self.DELETED != 0
+
+    def unwatched(self, cref: int) -> bool:
+        return self.data[cref + self.FLAGS] & self.UNWATCHED != 0
+
+    def delete(self, cref: int):
+        """
+        Mark a clause as deleted. Its space is reclaimed by compact().
+        """
+        self.data[cref + self.FLAGS] |= self.DELETED
+        self.wasted += self.HEADER + self.data[cref]
+        self.num_clauses -= 1
+
+    def compact(self) -> Dict[int, int]:
+        """
+        Move the live clauses to a new array, dropping deleted ones.
+        Return the mapping from old to new crefs of the live clauses.
+        """
+        data = self.data
+        compacted = array("i")
+        moved = {}
+        cref = 0
+        while cref < len(data):
+            end = cref + self.HEADER + data[cref]
+            if data[cref + self.FLAGS] & self.DELETED == 0:
+                moved[cref] = len(compacted)
+                compacted.extend(data[cref:end])
+            cref = end
+
+        self.data = compacted
+        self.wasted = 0
+        return moved
+
+    def copy(self) -> "ClauseArena":
+        """
+        Return an independent copy of the arena, with the same crefs.
+        """
+        other = ClauseArena()
+        other.data = array("i", self.data)
+        other.num_variables = self.num_variables
+        other.num_clauses = self.num_clauses
+        other.wasted = self.wasted
+        return other
+
+    def literals(self, cref: int) -> array:
+        """
+        Return a copy of the literals of a clause.
+        """
+        start = cref + self.HEADER
+        return self.data[start:start + self.data[cref]]
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Iterate over the crefs of all clauses that are not deleted.
+        """
+        data = self.data
+        cref = 0
+        while cref < len(data):
+            if data[cref + self.FLAGS] & self.DELETED == 0:
+                yield cref
+            cref += self.HEADER + data[cref]
+
+    def __len__(self):
+        return self.num_clauses
@@ -33,16 +33,32 @@
 
 
 
-import sys
+import time
 import random
 from dataclasses import dataclass
-from collections import defaultdict
-from typing import List, Set, Tuple, Optional, Iterator
+from typing import Iterable, List, Set, Tuple, Optional, Iterator, Union
 
 # Neste codigo tentamos otimizar ao mudar 
 # algumas estruturas como listas p numpy
 import numpy as np
 
+from arena import ClauseArena
+from budget import Budget, Unknown
+from cache import FormulaCache
+from dimacs import parse_dimacs, read_dimacs
+from preprocess import Preprocessor
+from proof import DratWriter
+from restarts import make_restart_policy
+from stats import Statistics
+from vsids import VariableHeap
+
+# Learnt clause database reduction: the first reduction happens after
+# FIRST_REDUCE conflicts, and the interval grows by REDUCE_INCREMENT.
+# Clauses with LBD up to GLUE_LBD ("glue" clauses) are never deleted.
+FIRST_REDUCE = 2000
+REDUCE_INCREMENT = 300
+GLUE_LBD = 2
+
 
 # frozen to be hashable
 @dataclass(frozen=True)
@@ -83,14 +99,86 @@ class Clause:
         return x
 
 
+class OccurrenceMatrix:
+    """
+    Clause x literal occurrence matrix in CSR form, for the bulk operations
+    over a formula: the literals of clause i, as DIMACS integers, are
+    literals[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, indptr: np.ndarray, literals: np.ndarray):
+        self.indptr = indptr
+        self.literals = literals
+        self.variables = np.abs(literals)
+        self.num_variables = int(self.variables.max(initial=0))
+
+    @classmethod
+    def from_arena(cls, clauses: ClauseArena) -> "OccurrenceMatrix":
+        """
+        Gather the clauses of an arena without visiting their literals
+        one by one: only the clause headers are walked.
+        """
+        data = np.frombuffer(clauses.data, dtype=np.int32)
+        crefs = np.fromiter(clauses, dtype=np.int64)
+        sizes = data[crefs].astype(np.int64)
+        indptr = np.zeros(len(crefs) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        # position in data of every literal: the first literal of its clause
+        # plus its offset in the clause
+        offsets = np.repeat(crefs + ClauseArena.HEADER - indptr[:-1], sizes)
+        positions = offsets + np.arange(indptr[-1], dtype=np.int64)
+        return cls(indptr, data[positions])
+
+    @classmethod
+    def from_clauses(cls, clauses: Iterable[Clause]) -> "OccurrenceMatrix":
+        clauses = list(clauses)
+        sizes = np.fromiter((len(clause) for clause in clauses), dtype=np.int64, count=len(clauses))
+        indptr = np.zeros(len(clauses) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        literals = np.fromiter(
+            (-lit.variable if lit.negation else lit.variable for clause in clauses for lit in clause),
+            dtype=np.int32, count=int(indptr[-1])
+        )
+        return cls(indptr, literals)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def variable_counts(self) -> np.ndarray:
+        """
+        Return the number of occurrences of every variable, indexed by it.
+        """
+        return np.bincount(self.variables, minlength=self.num_variables + 1)
+
+    def literal_counts(self) -> np.ndarray:
+        """
+        Return the number of occurrences of every literal, indexed by
+        2 * variable for positive literals and 2 * variable + 1 for negative.
+        """
+        codes = 2 * self.variables + (self.literals < 0)
+        return np.bincount(codes, minlength=2 * self.num_variables + 2)
+
+    def satisfied(self, values: np.ndarray) -> np.ndarray:
+        """
+        Return which clauses are satisfied, given values[var] = 1 for true
+        variables, -1 for false ones and 0 for unassigned ones.
+        """
+        true = values[self.variables] * np.sign(self.literals) > 0
+        # number of true literals of each clause, from prefix sums
+        prefix = np.zeros(len(true) + 1, dtype=np.int64)
+        np.cumsum(true, out=prefix[1:])
+        return prefix[self.indptr[1:]] > prefix[self.indptr[:-1]]
+
+
 @dataclass
 class Formula:
     clauses: List[Clause]
     __variables: Set[int]
 
-    def __init__(self, clauses: List[Clause]):
+    def __init__(self, clauses: List[Clause], matrix: Optional[OccurrenceMatrix] = None):
         """
-        Remove duplicate literals in clauses.
+        Remove duplicate literals in clauses. matrix is the occurrence matrix
+        of the clauses, built from them if not given.
         """
         self.clauses = []
         self.__variables = set()
@@ -100,6 +188,9 @@ class Formula:
                 var = lit.variable
                 self.__variables.add(var)
 
+        # original clauses only: learnt clauses are not added to it
+        self.matrix = matrix if matrix is not None else OccurrenceMatrix.from_clauses(self.clauses)
+
     def variables(self) -> Set[int]:
         """
         Return the set of variables contained in this formula.
@@ -119,20 +210,59 @@ class Formula:
 @dataclass
 class Assignment:
     value: bool
-    antecedent: Optional[Clause]
+    antecedent: Optional[int]  # id of the implying clause, None for decisions
     dl: int  # decision level
 
 
+def encode(literal: Literal) -> int:
+    """
+    Return the integer code of a literal: 2 * variable, plus 1 if negated.
+    The code of the negation is code ^ 1.
+    """
+    return 2 * literal.variable + literal.negation
+
+
+def decode(code: int) -> Literal:
+    """
+    Return the literal of an integer code.
+    """
+    return Literal(code >> 1, bool(code & 1))
+
+
 class Assignments(dict):
     """
-    The assignments, also stores the current decision level.
+    The assignments, also stores the trail of assigned literals split
+    in decision levels, the last value of every unassigned variable
+    (saved phases) and the value of every literal code, for unit propagation.
     """
 
-    def __init__(self):
+    def __init__(self, num_variables: int = 0):
         super().__init__()
 
-        # the decision level
-        self.dl = 0
+        # the true literal codes in assignment order, the trail index where
+        # each decision level starts, and the next literal to propagate
+        self.trail: List[int] = []
+        self.level_starts: List[int] = []
+        self.head = 0
+
+        # the saved phases
+        self.phases = {}
+
+        # flags of the variables met by conflict analysis, cleared after it
+        self.seen = [False] * (num_variables + 1)
+
+        # literal_values[code] is 1 if the literal is true, -1 if false, 0 if unassigned
+        self.literal_values = [0] * (2 * num_variables + 2)
+
+    @property
+    def dl(self) -> int:
+        """
+        The current decision level.
+        """
+        return len(self.level_starts)
+
+    def new_decision_level(self):
+        self.level_starts.append(len(self.trail))
 
     def value(self, literal: Literal) -> bool:
         """
@@ -143,316 +273,674 @@ class Assignments(dict):
         else:
             return self[literal.variable].value
 
-    def assign(self, variable: int, value: bool, antecedent: Optional[Clause]):
+    def assign(self, variable: int, value: bool, antecedent: Optional[int]):
         self[variable] = Assignment(value, antecedent, self.dl)
+        code = 2 * variable + (not value)
+        self.literal_values[code] = 1
+        self.literal_values[code ^ 1] = -1
+        self.trail.append(code)
 
     def unassign(self, variable: int):
-        self.pop(variable)
+        self.phases[variable] = self.pop(variable).value
+        self.literal_values[2 * variable] = self.literal_values[2 * variable + 1] = 0
 
     def satisfy(self, formula: Formula) -> bool:
         """
         Check whether the assignments actually satisfies the formula.
+        Only the original clauses are checked, as the learnt ones follow
+        from them.
         """
-        for clause in formula:
-            if True not in [self.value(lit) for lit in clause]:
-                return False
+        matrix = formula.matrix
+        variables = np.fromiter(self.keys(), dtype=np.int64, count=len(self))
+        values = np.zeros(max(matrix.num_variables, int(variables.max(initial=0))) + 1, dtype=np.int8)
+        values[variables] = np.fromiter(
+            (1 if assignment.value else -1 for assignment in self.values()),
+            dtype=np.int8, count=len(self)
+        )
+        return bool(matrix.satisfied(values).all())
 
-        return True
 
+class ClauseStore:
+    """
+    The clauses being solved, as lists of literal codes indexed by clause
+    id. The first two literals of a clause are the watched ones. Deleted
+    clauses are replaced by None, so that clause ids stay valid.
+    """
 
-def cdcl_solve(formula: Formula) -> Optional[Assignments]:
+    def __init__(self, formula: Formula):
+        self.literals: List[Optional[List[int]]] = [
+            [encode(lit) for lit in clause] for clause in formula
+        ]
+        # literal block distance of learnt clauses, 0 for original clauses
+        self.lbd: List[int] = [0] * len(self.literals)
+        # last conflict in which the clause was an antecedent
+        self.used: List[int] = [0] * len(self.literals)
+
+    def add(self, literals: List[int], lbd: int) -> int:
+        """
+        Add a learnt clause and return its id.
+        """
+        self.literals.append(literals)
+        self.lbd.append(lbd)
+        self.used.append(0)
+        return len(self.literals) - 1
+
+    def delete(self, cid: int):
+        self.literals[cid] = None
+
+
+def cdcl_solve(
+    formula: Formula,
+    restart: str = "glucose",
+    reuse_trail: bool = False,
+    stats: Optional[Statistics] = None,
+    proof: Optional[DratWriter] = None,
+    budget: Optional[Budget] = None,
+) -> Union[Assignments, Unknown, None]:
     """
     Solve the CNF formula using the CDCL algorithm with VSIDS.
+    restart picks the restart policy ("glucose", "luby" or "none"), and
+    reuse_trail keeps on restart the decision levels that would be redone.
+    The counters of the run are collected in stats, if given, and the
+    learnt and deleted clauses are logged to the DRAT proof, if given.
+    Return the assignments of a model, None if UNSAT, or Unknown if the
+    budget, if given, runs out first.
     """
-    assignments = Assignments()
-    lit2clauses, clause2lits = init_watches(formula)
+    if stats is None:
+        stats = Statistics()
+    if budget is not None:
+        budget.start(stats)
+    times = stats.times
+    clock = time.perf_counter
+
+    variables = formula.variables()
+    num_variables = max(variables, default=0)
+    assignments = Assignments(num_variables)
+    clauses = ClauseStore(formula)
+    watches, binaries = init_watches(clauses, num_variables)
 
     # Initialize VSIDS scores
-    vsids_scores = defaultdict(int)
-    decay_factor = 0.95  # Decay factor for VSIDS scores
-
-    # Populate VSIDS scores initially
-    for clause in formula:
-        for literal in clause:
-            vsids_scores[literal.variable] += 1
-
-    # Unit propagation for unit clauses
-    unit_clauses = [clause for clause in formula if len(clause) == 1]
-    to_propagate = []
-    for clause in unit_clauses:
-        lit = clause.literals[0]
-        var = lit.variable
-        val = not lit.negation
-        if var not in assignments:
-            assignments.assign(var, val, clause)
-            to_propagate.append(lit)
-
-    reason, conflict_clause = unit_propagation(
-        assignments, lit2clauses, clause2lits, to_propagate
-    )
-    if reason == "conflict":
+    heap = VariableHeap(num_variables, decay=0.95)
+
+    # Populate VSIDS scores initially: the occurrence counts of the variables
+    counts = formula.matrix.variable_counts()
+    size = min(len(counts), len(heap.activity))
+    heap.activity[:size] = counts[:size].astype(np.float64).tolist()
+    heap.build(variables)
+
+    # Unit propagation for unit clauses, an empty clause is UNSAT right away
+    # Longer clauses are left to unit_propagation(), through the watches
+    conflict = None
+    for cid, literals in enumerate(clauses.literals):
+        if len(literals) == 0 or len(literals) == 1 and assignments.literal_values[literals[0]] == -1:
+            conflict = cid
+            break
+        if len(literals) == 1 and assignments.literal_values[literals[0]] == 0:
+            assignments.assign(literals[0] >> 1, not literals[0] & 1, cid)
+
+    if conflict is None:
+        conflict = unit_propagation(assignments, clauses, watches, binaries)
+    if conflict is not None:
+        if proof is not None:
+            proof.add(())
         return None  # UNSAT due to conflict in unit propagation
 
-    while not all_variables_assigned(formula, assignments):
+    restart_policy = make_restart_policy(restart)
+
+    # Learnt clause database reduction schedule
+    learnts = []
+    next_reduce = FIRST_REDUCE
+    reduce_interval = FIRST_REDUCE
+
+    # the longest trail met at a conflict, only kept with a budget
+    partial = []
+
+    while True:
+        if stats.conflicts >= next_reduce:
+            size = len(learnts)
+            learnts = reduce_learnt_clauses(clauses, learnts, assignments, watches, proof)
+            stats.reductions += 1
+            stats.deleted += size - len(learnts)
+            reduce_interval += REDUCE_INCREMENT
+            next_reduce = stats.conflicts + reduce_interval
+
+        if restart_policy is not None and restart_policy.should_restart():
+            start = clock()
+            level = restart_level(assignments, heap, reuse_trail)
+            backtrack(assignments, level, heap)
+            times["backtrack"] += clock() - start
+            restart_policy.restarted()
+            stats.restarts += 1
+
         # Decision step: Pick a variable and assign it
-        var, val = pick_branching_variable(formula, assignments, vsids_scores, decay_factor)
+        start = clock()
+        var, val = pick_branching_variable(assignments, heap)
+        times["decide"] += clock() - start
         if var is None:  # No variables left to assign
             break
-        assignments.dl += 1
+        stats.decisions += 1
+        assignments.new_decision_level()
         assignments.assign(var, val, antecedent=None)
-        to_propagate = [Literal(var, not val)]
 
         while True:
+            if budget is not None and budget.exhausted(stats):
+                if len(assignments.trail) > len(partial):
+                    partial = list(assignments.trail)
+                return Unknown(budget.reason, dimacs_literals(partial))
+
             # Propagate and check for conflicts
-            reason, conflict_clause = unit_propagation(
-                assignments, lit2clauses, clause2lits, to_propagate
-            )
-            if reason != "conflict":
+            assigned = len(assignments)
+            start = clock()
+            conflict = unit_propagation(assignments, clauses, watches, binaries)
+            times["propagate"] += clock() - start
+            stats.propagations += len(assignments) - assigned
+            if conflict is None:
                 break  # No conflict, return to decision step
 
             # Analyze conflict and learn a new clause
-            backtrack_level, learnt_clause = conflict_analysis(conflict_clause, assignments)
-            if learnt_clause == conflict_clause:
-                return None  # UNSAT
+            stats.conflicts += 1
+            if stats.conflicts >= stats.next_checkpoint:
+                stats.checkpoint()
+            if budget is not None and len(assignments.trail) > len(partial):
+                partial = list(assignments.trail)
+            start = clock()
+            subsumed = []
+            backtrack_level, learnt_clause = conflict_analysis(
+                clauses.literals[conflict], clauses, assignments, stats.conflicts, subsumed
+            )
             if backtrack_level < 0:
+                if proof is not None:
+                    proof.add(())
                 return None  # UNSAT
+            for cid, literals in subsumed:
+                strengthen_clause(clauses, cid, literals, assignments, watches, proof)
+            if proof is not None:
+                proof.add(dimacs_literals(learnt_clause))
 
             # Add learnt clause and update VSIDS scores
-            add_learnt_clause(
-                formula, learnt_clause, assignments, lit2clauses, clause2lits
-            )
-            update_vsids(vsids_scores, learnt_clause)  # Update VSIDS scores
-            backtrack(assignments, backtrack_level)
-            assignments.dl = backtrack_level
-
-            # Prepare for next propagation step
-            unassigned_literals = [
-                lit
-                for lit in learnt_clause
-                if lit.variable not in assignments
-            ]
-            if len(unassigned_literals) == 1:
-                lit = unassigned_literals[0]
-                var = lit.variable
-                val = not lit.negation
-                assignments.assign(var, val, antecedent=learnt_clause)
-                to_propagate = [Literal(var, not val)]
+            cid = add_learnt_clause(clauses, learnt_clause, assignments, watches, binaries)
+            learnts.append(cid)
+            if restart_policy is not None:
+                restart_policy.on_conflict(clauses.lbd[cid])
+            update_vsids(heap, learnt_clause)  # Update VSIDS scores
+            times["analyze"] += clock() - start
+            stats.learned_clause(len(learnt_clause), assignments.dl - backtrack_level)
+
+            start = clock()
+            backtrack(assignments, backtrack_level, heap)
+            times["backtrack"] += clock() - start
+
+            # The learnt clause is asserting: after the backjump its first
+            # literal is the only unassigned one, so it is implied
+            lit = clauses.literals[cid][0]
+            assignments.assign(lit >> 1, not lit & 1, cid)
+
+    return assignments
 
+
+def preprocess_and_solve(
+    clauses: ClauseArena, preprocess_budget: float = 1.0, **options
+) -> Union[Assignments, Unknown, None]:
+    """
+    Simplify the clauses with the Preprocessor, spending at most
+    preprocess_budget seconds, solve the simplified formula with
+    cdcl_solve() and extend its model to the eliminated variables.
+    A proof of the simplified formula would not certify the original one,
+    so no DRAT proof can be requested.
+    """
+    if options.get("proof") is not None:
+        raise ValueError("DRAT proofs are not supported with preprocessing")
+    preprocessor = Preprocessor(clauses, preprocess_budget)
+    simplified = preprocessor.run()
+    if simplified is None:
+        return None
+
+    assignments = cdcl_solve(arena_to_formula(simplified), **options)
+    if assignments is None or isinstance(assignments, Unknown):
+        return assignments
+
+    model = preprocessor.extend_model(
+        var if assignment.value else -var
+        for var, assignment in assignments.items()
+    )
+    # the eliminated variables may lie past those of the simplified formula
+    literal_values = assignments.literal_values
+    literal_values.extend([0] * (2 * len(model) + 2 - len(literal_values)))
+    for literal in model:
+        if abs(literal) not in assignments:
+            assignments.assign(abs(literal), literal > 0, None)
     return assignments
 
 
-def add_learnt_clause(formula, clause, assignments, lit2clauses, clause2lits):
-    formula.clauses.append(clause)
-    for lit in sorted(
-        clause,
-        key=lambda lit: -assignments[lit.variable].dl
-        if lit.variable in assignments else float('-inf')
-    ):
-        if len(clause2lits[clause]) < 2:
-            clause2lits[clause].append(lit)
-            lit2clauses[lit].append(clause)
+def add_learnt_clause(
+    clauses: ClauseStore,
+    literals: List[int],
+    assignments: Assignments,
+    watches: List[List[int]],
+    binaries: List[List[Tuple[int, int]]],
+) -> int:
+    """
+    Add and watch a learnt clause, computing its LBD. The literals are
+    ordered by decreasing decision level, so that the only literal of the
+    current level is first and one of the backjump level second: these two
+    are watched. Return the id of the clause.
+    """
+    levels = {lit: assignments[lit >> 1].dl for lit in literals}
+    literals = sorted(literals, key=lambda lit: -levels[lit])
+    cid = clauses.add(literals, len(set(levels.values())))
+    if len(literals) > 1:
+        watch_clause(cid, literals, watches, binaries)
+    return cid
+
+
+def reduce_learnt_clauses(
+    clauses: ClauseStore,
+    learnts: List[int],
+    assignments: Assignments,
+    watches: List[List[int]],
+    proof: Optional[DratWriter] = None,
+) -> List[int]:
+    """
+    Delete half of the learnt clauses, ranked by LBD and then by how recently
+    they took part in a conflict. Glue clauses and antecedents of current
+    assignments are kept, so binary clauses, whose LBD is at most 2, never
+    leave the implication lists. Return the ids of the learnt clauses that
+    remain.
+    The deletions are logged to the DRAT proof, if given.
+    """
+    kept = []
+    candidates = []
+    for cid in learnts:
+        # a clause can only be the antecedent of its first literal
+        assignment = assignments.get(clauses.literals[cid][0] >> 1)
+        locked = assignment is not None and assignment.antecedent == cid
+        if locked or clauses.lbd[cid] <= GLUE_LBD:
+            kept.append(cid)
         else:
-            break
+            candidates.append(cid)
 
+    candidates.sort(key=lambda cid: (clauses.lbd[cid], -clauses.used[cid]))
+    kept.extend(candidates[:len(candidates) // 2])
+    for cid in candidates[len(candidates) // 2:]:
+        if proof is not None:
+            proof.delete(dimacs_literals(clauses.literals[cid]))
+        clauses.delete(cid)
 
-def all_variables_assigned(formula: Formula, assignments: Assignments) -> bool:
-    return len(formula.variables()) == len(assignments)
+    # detach the deleted clauses from the watches
+    literals = clauses.literals
+    for code in range(len(watches)):
+        watches[code] = [cid for cid in watches[code] if literals[cid] is not None]
+    return kept
 
 
 def pick_branching_variable(
-    formula: Formula, assignments: Assignments, vsids_scores: defaultdict, decay_factor: float
+    assignments: Assignments, heap: VariableHeap
 ) -> Tuple[int, bool]:
     """
     Pick the next branching variable using VSIDS heuristic.
     """
-    # Decay scores periodically
-    if assignments.dl % 100 == 0:  # Decay every 100 decision levels
-        for var in vsids_scores:
-            vsids_scores[var] *= decay_factor
+    # Pick the unassigned variable with the highest score.
+    # Assigned variables are dropped here, backtrack() reinserts them.
+    while len(heap) > 0:
+        var = heap.pop()
+        if var not in assignments:
+            # Saved phase, or random polarity for never assigned variables
+            val = assignments.phases.get(var)
+            if val is None:
+                val = random.choice([True, False])
+            return var, val
+
+    return None, None
+
+
+def restart_level(assignments: Assignments, heap: VariableHeap, reuse_trail: bool) -> int:
+    """
+    Return the decision level to backtrack to on a restart. With reuse_trail,
+    the levels whose decision is more active than the next decision are kept,
+    since the solver would take the same decisions again right away.
+    """
+    if not reuse_trail:
+        return 0
 
-    # Pick the unassigned variable with the highest score
-    unassigned_vars = [var for var in formula.variables() if var not in assignments]
-    if not unassigned_vars:
-        return None, None
+    while len(heap) > 0 and heap.top() in assignments:
+        heap.pop()
+    if len(heap) == 0:
+        return 0
 
-    var = max(unassigned_vars, key=lambda v: vsids_scores[v])
-    val = random.choice([True, False])  # Random polarity
-    return var, val
+    # the decision of each level is the first literal of the level
+    next_activity = heap.activity[heap.top()]
+    for level, start in enumerate(assignments.level_starts):
+        if heap.activity[assignments.trail[start] >> 1] < next_activity:
+            return level
+    return assignments.dl
 
 
-def update_vsids(vsids_scores: defaultdict, clause: Clause):
+def update_vsids(heap: VariableHeap, clause: List[int]):
     """
-    Update VSIDS scores for literals in a learned clause.
+    Update VSIDS scores for literals in a learned clause, then decay.
     """
     for literal in clause:
-        vsids_scores[literal.variable] += 1
+        heap.bump(literal >> 1)
+    heap.decay_all()
 
 
-def backtrack(assignments: Assignments, b: int):
-    to_remove = []
-    for var, assignment in assignments.items():
-        if assignment.dl > b:
-            to_remove.append(var)
+def backtrack(assignments: Assignments, b: int, heap: VariableHeap):
+    """
+    Undo the decision levels above b, popping their literals off the trail.
+    """
+    if assignments.dl <= b:
+        return
 
-    for var in to_remove:
+    trail = assignments.trail
+    start = assignments.level_starts[b]
+    for i in range(len(trail) - 1, start - 1, -1):
+        var = trail[i] >> 1
         assignments.unassign(var)
+        heap.push(var)
+
+    del trail[start:]
+    del assignments.level_starts[b:]
+    assignments.head = start
 
 
 def unit_propagation(
-    assignments, lit2clauses, clause2lits, to_propagate: List[Literal]
-) -> Tuple[str, Optional[Clause]]:
-    while len(to_propagate) > 0:
-        watching_lit = to_propagate.pop().neg()
-
-        # use list(.) to copy it because size of
-        # lit2clauses[watching_lit]might change during for-loop
-        watching_clauses = list(lit2clauses[watching_lit])
-        for watching_clause in watching_clauses:
-            for lit in watching_clause:
-                if lit in clause2lits[watching_clause]:
-                    # lit is another watching literal of watching_clause
-                    continue
-                elif lit.variable in assignments and not assignments.value(lit):
-                    # lit is a assigned False
-                    continue
-                else:
-                    # lit is not another watching literal of watching_clause
-                    # and is non-False literal, so we rewatch it. (case 1)
-                    clause2lits[watching_clause].remove(watching_lit)
-                    clause2lits[watching_clause].append(lit)
-                    lit2clauses[watching_lit].remove(watching_clause)
-                    lit2clauses[lit].append(watching_clause)
+    assignments: Assignments,
+    clauses: ClauseStore,
+    watches: List[List[int]],
+    binaries: List[List[Tuple[int, int]]],
+) -> Optional[int]:
+    """
+    Propagate the literals of the trail from its head on, and the ones they
+    imply, which are appended to the trail: it is the propagation queue.
+    Return the id of a conflicting clause, or None.
+
+    The binary implications of a literal that became false are propagated
+    first, straight from its implication list. Then only the longer clauses
+    watching it are visited. The watched literals are the first two of each
+    clause, the false one is swapped to the second position and replaced,
+    if possible, by another non-false literal. Watch lists are compacted in
+    place.
+    """
+    values = assignments.literal_values
+    literals = clauses.literals
+    trail = assignments.trail
+    while assignments.head < len(trail):
+        false_lit = trail[assignments.head] ^ 1
+        assignments.head += 1
+
+        for implied, cid in binaries[false_lit]:
+            if values[implied] == 0:
+                assignments.assign(implied >> 1, not implied & 1, cid)
+            elif values[implied] == -1:
+                return cid
+
+        watching_clauses = watches[false_lit]
+
+        kept = 0
+        i = 0
+        while i < len(watching_clauses):
+            cid = watching_clauses[i]
+            i += 1
+            clause = literals[cid]
+            if clause[0] == false_lit:
+                clause[0] = clause[1]
+                clause[1] = false_lit
+
+            # the other watching literal is assigned True (case 2)
+            first = clause[0]
+            if values[first] == 1:
+                watching_clauses[kept] = cid
+                kept += 1
+                continue
+
+            for k in range(2, len(clause)):
+                lit = clause[k]
+                if values[lit] != -1:
+                    # lit is a non-False literal, so we rewatch it (case 1)
+                    clause[1] = lit
+                    clause[k] = false_lit
+                    watches[lit].append(cid)
                     break
             else:
-                # we cannot find another literal to rewatch (case 2,3,4)
-                watching_lits = clause2lits[watching_clause]
-                if len(watching_lits) == 1:
-                    # watching_clause is unit clause, and the only literal
-                    # is assigned False, thus indicates a conflict
-                    return "conflict", watching_clause
-
-                # the other watching literal
-                other = (
-                    watching_lits[0]
-                    if watching_lits[1] == watching_lit
-                    else watching_lits[1]
-                )
-                if other.variable not in assignments:
-                    # the other watching literal is unassigned. (case 3)
-                    assignments.assign(
-                        other.variable, not other.negation, watching_clause
-                    )
-                    to_propagate.insert(0, other)
-                elif assignments.value(other):
-                    # the other watching literal is assigned True. (case 2)
-                    continue
+                watching_clauses[kept] = cid
+                kept += 1
+                if values[first] == 0:
+                    # the other watching literal is unassigned (case 3)
+                    assignments.assign(first >> 1, not first & 1, cid)
                 else:
-                    # the other watching literal is assigned False. (case 4)
-                    return "conflict", watching_clause
+                    # the other watching literal is assigned False (case 4)
+                    del watching_clauses[kept:i]
+                    return cid
 
-    return "unresolved", None
+        del watching_clauses[kept:]
 
+    return None
 
-def resolve(a: Clause, b: Clause, x: int) -> Clause:
+
+def conflict_analysis(
+    clause: List[int],
+    clauses: ClauseStore,
+    assignments: Assignments,
+    conflicts: int = 0,
+    subsumed: Optional[List[Tuple[int, List[int]]]] = None,
+) -> Tuple[int, Optional[List[int]]]:
     """
-    The resolution operation
+    Learn the first-UIP clause of a conflict: the conflicting clause is
+    resolved with the antecedents of the current-level literals, from the
+    end of the trail backwards, until a single current-level literal is left.
+    The resolvents are never built, their variables are flagged in
+    assignments.seen and only their lower-level literals are collected.
+
+    The learnt clause is then minimized, dropping the literals implied by
+    the other ones (see redundant()). If subsumed is given, it receives the
+    learnt antecedents subsumed by an intermediate resolvent, together with
+    the literals of that resolvent (see strengthen_clause()).
+
+    Return the backjump level, the second largest decision level of the
+    clause, and the clause; or (-1, None) for a conflict at level 0.
     """
-    result = set(a.literals + b.literals) - {Literal(x, True), Literal(x, False)}
-    result = list(result)
-    return Clause(result)
-
-
-def conflict_analysis(clause: Clause, assignments: Assignments) -> Tuple[int, Clause]:
     if assignments.dl == 0:
         return (-1, None)
 
-    # literals with current decision level
-    literals = [
-        literal
-        for literal in clause
-        if literal.variable in assignments and
-        assignments[literal.variable].dl == assignments.dl
-    ]
-    while len(literals) != 1:
-        # implied literals
-        literals = filter(
-            lambda lit: (
-                lit.variable in assignments and
-                assignments[lit.variable].antecedent is not None
-            ),
-            literals
-        )
-
-        # select any literal that meets the criterion
-        try:
-            literal = next(literals)
-        except StopIteration:
+    seen = assignments.seen
+    trail = assignments.trail
+    current = assignments.dl
+
+    learnt = []
+    pending = 0
+    resolved = -1  # variable resolved on, -1 for the conflicting clause
+    antecedent = None
+    i = len(trail) - 1
+    while True:
+        in_clause = 0
+        for lit in clause:
+            var = lit >> 1
+            if var == resolved:
+                continue
+            dl = assignments[var].dl
+            if dl == 0:
+                continue
+            in_clause += 1
+            if seen[var]:
+                continue
+            seen[var] = True
+            if dl == current:
+                pending += 1
+            else:
+                learnt.append(lit)
+
+        # every literal of the resolvent comes from the antecedent, so the
+        # resolvent subsumes it; only long learnt clauses are replaced, and
+        # only while two current-level literals are left to be watched
+        if (subsumed is not None and antecedent is not None and pending >= 2 and in_clause >= 3
+                and in_clause == len(learnt) + pending and clauses.lbd[antecedent] > 0):
+            resolvent = [lit for lit in clause if lit >> 1 != resolved and assignments[lit >> 1].dl > 0]
+            resolvent.sort(key=lambda lit: -assignments[lit >> 1].dl)
+            subsumed.append((antecedent, resolvent))
+
+        # the last flagged literal of the trail is the next one to resolve on
+        while not seen[trail[i] >> 1]:
+            i -= 1
+        resolved = trail[i] >> 1
+        seen[resolved] = False
+        i -= 1
+        pending -= 1
+        if pending == 0:
             break
-        antecedent = assignments[literal.variable].antecedent
-        clause = resolve(clause, antecedent, literal.variable)
-
-        # literals with current decision level
-        literals = [
-            literal
-            for literal in clause
-            if literal.variable in assignments and
-            assignments[literal.variable].dl == assignments.dl
-        ]
-
-    # out of the loop, clause is now the new learnt clause
-    # compute the backtrack level b (second largest decision level)
+        antecedent = assignments[resolved].antecedent
+        clauses.used[antecedent] = conflicts
+        clause = clauses.literals[antecedent]
+
+    # the lower-level literals are still flagged while minimizing
+    abstract = 0
+    for lit in learnt:
+        abstract |= 1 << (assignments[lit >> 1].dl & 31)
+    marked = []
+    minimized = [trail[i + 1] ^ 1]
+    for lit in learnt:
+        if assignments[lit >> 1].antecedent is None or not redundant(
+            lit >> 1, clauses, assignments, abstract, marked
+        ):
+            minimized.append(lit)
+    for lit in learnt:
+        seen[lit >> 1] = False
+    for var in marked:
+        seen[var] = False
+
+    backtrack_level = max((assignments[lit >> 1].dl for lit in minimized[1:]), default=0)
+    return backtrack_level, minimized
+
+
+def redundant(
+    variable: int, clauses: ClauseStore, assignments: Assignments, abstract: int, marked: List[int]
+) -> bool:
+    """
+    Whether the value of variable, from a literal of the learnt clause, is
+    implied by the other literals of the clause, following the antecedents
+    in the implication graph. The variables of the clause are flagged in
+    assignments.seen, as are those already proven redundant, which are
+    appended to marked so that the caller can clear them.
+
+    abstract has a bit for each decision level of the clause: a variable of
+    another level, or a decision, cannot be implied by the clause alone.
+    """
+    seen = assignments.seen
+    top = len(marked)
+    stack = [variable]
+    while stack:
+        for lit in clauses.literals[assignments[stack.pop()].antecedent]:
+            var = lit >> 1
+            if seen[var]:
+                continue
+            assignment = assignments[var]
+            if assignment.dl == 0:
+                continue
+            if assignment.antecedent is None or not (1 << (assignment.dl & 31)) & abstract:
+                for marked_var in marked[top:]:
+                    seen[marked_var] = False
+                del marked[top:]
+                return False
+            seen[var] = True
+            stack.append(var)
+            marked.append(var)
+    return True
+
+
+def strengthen_clause(
+    clauses: ClauseStore,
+    cid: int,
+    literals: List[int],
+    assignments: Assignments,
+    watches: List[List[int]],
+    proof: Optional[DratWriter] = None,
+):
+    """
+    Replace a learnt clause by the resolvent subsuming it found by conflict
+    analysis. The first two literals of the resolvent, of the conflict
+    level, are unassigned by the backjump and become the watched ones.
+    """
+    old = clauses.literals[cid]
+    watches[old[0]].remove(cid)
+    watches[old[1]].remove(cid)
+    if proof is not None:
+        proof.add(dimacs_literals(literals))
+        proof.delete(dimacs_literals(old))
 
-    decision_levels = sorted(
-        set(assignments[literal.variable].dl
-            for literal in clause
-            if literal.variable in assignments)
-    )
-    if len(decision_levels) <= 1:
-        return 0, clause
-    else:
-        return decision_levels[-2], clause
+    clauses.literals[cid] = literals
+    clauses.lbd[cid] = min(clauses.lbd[cid], len({assignments[lit >> 1].dl for lit in literals}))
+    watches[literals[0]].append(cid)
+    watches[literals[1]].append(cid)
 
 
 def parse_dimacs_cnf(content: str) -> Formula:
     """
     parse the DIMACS cnf file format into corresponding Formula.
     """
-    clauses = [Clause([])]
-    for line in content.splitlines():
-        tokens = line.split()
-        if len(tokens) != 0 and tokens[0] not in ("p", "c"):
-            for tok in tokens:
-                lit = int(tok)
-                if lit == 0:
-                    clauses.append(Clause([]))
-                else:
-                    var = abs(lit)
-                    neg = lit < 0
-                    clauses[-1].literals.append(Literal(var, neg))
+    return arena_to_formula(parse_dimacs([content.encode()]))
 
-    if len(clauses[-1]) == 0:
-        clauses.pop()
 
-    return Formula(clauses)
+def load_dimacs_cnf(filename: str, cache: Optional[FormulaCache] = None) -> Formula:
+    """
+    Stream a (possibly compressed) DIMACS cnf file into a Formula. With a
+    cache, the parsed clauses and their occurrence matrix are read from it.
+    """
+    if cache is None:
+        return arena_to_formula(read_dimacs(filename))
+    entry = cache.read(filename)
+    matrix = OccurrenceMatrix(
+        np.frombuffer(entry.indptr, dtype=np.int64), np.frombuffer(entry.literals, dtype=np.int32)
+    )
+    return arena_to_formula(entry.clauses, matrix)
 
 
-def init_watches(formula: Formula):
+def arena_to_formula(clauses: ClauseArena, matrix: Optional[OccurrenceMatrix] = None) -> Formula:
     """
-    Return lit2clauses and clause2lits
+    Build a Formula from the clauses of an arena. matrix is their occurrence
+    matrix, built from the arena if not given.
     """
+    return Formula([
+        Clause([Literal(abs(lit), lit < 0) for lit in clauses.literals(cref)])
+        for cref in clauses
+    ], matrix if matrix is not None else OccurrenceMatrix.from_arena(clauses))
 
-    lit2clauses = defaultdict(list)
-    clause2lits = defaultdict(list)
 
-    for clause in formula:
-        if len(clause.literals) > 0:
-            if len(clause) == 1:
-                lit2clauses[clause.literals[0]].append(clause)
-                clause2lits[clause].append(clause.literals[0])
-            else:
-                lit2clauses[clause.literals[0]].append(clause)
-                lit2clauses[clause.literals[1]].append(clause)
-                clause2lits[clause].append(clause.literals[0])
-                clause2lits[clause].append(clause.literals[1])
+def dimacs_literals(clause: List[int]) -> List[int]:
+    """
+    Return literal codes as DIMACS integers.
+    """
+    return [-(code >> 1) if code & 1 else code >> 1 for code in clause]
+
 
-    return lit2clauses, clause2lits
\ No newline at end of file
+def watch_clause(
+    cid: int,
+    literals: List[int],
+    watches: List[List[int]],
+    binaries: List[List[Tuple[int, int]]],
+):
+    """
+    Watch the first two literals of a clause. A binary clause goes to the
+    implication lists instead: each of its literals, when false, implies
+    the other one, whose antecedent is stored next to it.
+    """
+    if len(literals) == 2:
+        binaries[literals[0]].append((literals[1], cid))
+        binaries[literals[1]].append((literals[0], cid))
+    else:
+        watches[literals[0]].append(cid)
+        watches[literals[1]].append(cid)
+
+
+def init_watches(
+    clauses: ClauseStore, num_variables: int
+) -> Tuple[List[List[int]], List[List[Tuple[int, int]]]]:
+    """
+    Return the watch lists, the ids of the clauses of three or more literals
+    watching each literal code, and the binary implication lists, the
+    (implied literal, clause id) pairs of each literal code.
+    """
+    watches = [[] for _ in range(2 * num_variables + 2)]
+    binaries = [[] for _ in range(2 * num_variables + 2)]
+    for cid, literals in enumerate(clauses.literals):
+        if len(literals) > 1:
+            watch_clause(cid, literals, watches, binaries)
+    return watches, binaries
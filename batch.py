@@ -0,0 +1,403 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from budget import Budget, Unknown
+from cache import FormulaCache
+from dimacs import read_dimacs
+from main import check_model, solve
+from preprocess import Preprocessor
+from restarts import RESTART_POLICIES
+from stats import COUNTERS, PHASES, Statistics
+from symmetry import SymmetryBreaker
+
+CNF_SUFFIXES = (".cnf", ".cnf.gz", ".cnf.xz", ".cnf.bz2")
+
+# seconds a worker gets past the timeout to stop on its own, before it is
+# killed (parsing and preprocessing do not check the budget)
+GRACE_TIME = 2.0
+
+# status of the runs stopped by each reason of their budget
+STOPPED = {"time": "TIMEOUT", "memory": "MEMOUT"}
+
+# columns of the CSV output, in order
+FIELDS = (
+    ("instance", "engine", "status", "expected", "ok", "time", "solve_time")
+    + COUNTERS + tuple(f"{phase}_time" for phase in PHASES) + ("peak_rss_kb", "error")
+)
+
+
+def _read_arena(filename: str, cache: Optional[FormulaCache]):
+    if cache is None:
+        return read_dimacs(filename)
+    return cache.read(filename).clauses
+
+
+def _stopped(result: Union[Unknown, None, object]) -> Optional[str]:
+    if isinstance(result, Unknown):
+        return STOPPED.get(result.reason, "UNKNOWN")
+    return None
+
+
+def _solve_main(
+    filename: str, stats: Statistics, preprocess: bool, symmetry: bool,
+    cache: Optional[FormulaCache], options: Dict
+) -> Tuple[str, float]:
+    original = clauses = _read_arena(filename, cache)
+    start = time.perf_counter()
+    preprocessor = None
+    if preprocess:
+        preprocessor = Preprocessor(clauses)
+        clauses = preprocessor.run()
+    # the auxiliary variables of the symmetry breaking are dropped by
+    # extend_model() and ignored by check_model()
+    if symmetry and clauses is not None:
+        clauses = SymmetryBreaker(clauses).run()
+    result = None if clauses is None else solve(clauses, stats=stats, **options)
+    solve_time = time.perf_counter() - start
+
+    if _stopped(result):
+        return _stopped(result), solve_time
+    if result is None:
+        return "UNSATISFIABLE", solve_time
+    if preprocessor is not None:
+        result = preprocessor.extend_model(result)
+    if check_model(original, result) is not None:
+        return "INVALID_MODEL", solve_time
+    return "SATISFIABLE", solve_time
+
+
+def _solve_back(
+    filename: str, stats: Statistics, preprocess: bool, symmetry: bool,
+    cache: Optional[FormulaCache], options: Dict
+) -> Tuple[str, float]:
+    # imported here so that the main engine does not need NumPy
+    import back
+
+    if preprocess or symmetry:
+        original = clauses = _read_arena(filename, cache)
+        start = time.perf_counter()
+        if symmetry:
+            clauses = SymmetryBreaker(clauses).run()
+        if preprocess:
+            result = back.preprocess_and_solve(clauses, stats=stats, **options)
+        else:
+            result = back.cdcl_solve(back.arena_to_formula(clauses), stats=stats, **options)
+        solve_time = time.perf_counter() - start
+        if _stopped(result):
+            return _stopped(result), solve_time
+        valid = result is None or check_model(original, (
+            var if assignment.value else -var for var, assignment in result.items()
+        )) is None
+    else:
+        formula = back.load_dimacs_cnf(filename, cache)
+        start = time.perf_counter()
+        result = back.cdcl_solve(formula, stats=stats, **options)
+        solve_time = time.perf_counter() - start
+        if _stopped(result):
+            return _stopped(result), solve_time
+        valid = result is None or result.satisfy(formula)
+
+    if result is None:
+        return "UNSATISFIABLE", solve_time
+    return "SATISFIABLE" if valid else "INVALID_MODEL", solve_time
+
+
+# solver engines: functions that read (through the cache, if given) and solve
+# a file, and return the verdict, INVALID_MODEL if the model found does not
+# satisfy the formula, or the STOPPED status if the budget in the options ran
+# out, and the time spent solving (without parsing)
+ENGINES = {"main": _solve_main, "back": _solve_back}
+
+
+def collect_instances(paths: List[str]) -> List[str]:
+    """
+    Return the CNF files given, looking inside directories (not recursively).
+    """
+    instances = []
+    for path in paths:
+        if os.path.isdir(path):
+            instances.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(CNF_SUFFIXES)
+            ))
+        else:
+            instances.append(path)
+    return instances
+
+
+def load_expected(filename: str) -> Dict[str, str]:
+    """
+    Read an expected-results file: one "<instance> SATISFIABLE|UNSATISFIABLE"
+    per line, instances given relative to the file's directory. Lines
+    starting with # are comments.
+    """
+    base = os.path.dirname(filename)
+    expected = {}
+    with open(filename) as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            instance, status = fields
+            expected[os.path.normpath(os.path.join(base, instance))] = status
+    return expected
+
+
+def _reset_peak_memory():
+    """
+    Reset the peak resident set size of the process (Linux only), so that
+    each instance solved by a reused worker reports its own peak.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _run_instance(
+    filename: str,
+    engine: str,
+    options: Dict,
+    preprocess: bool,
+    symmetry: bool,
+    timeout: Optional[float],
+    memory_limit: Optional[int],
+    cache: Optional[FormulaCache],
+) -> Dict:
+    """
+    Solve one instance within the time and memory budget, and return its
+    result row. An unexpected exception gives an ERROR row, with the
+    exception in its error field, and its traceback goes to stderr.
+    """
+    _reset_peak_memory()
+    stats = Statistics()
+    budget = Budget(seconds=timeout, memory=memory_limit)
+    start = time.perf_counter()
+    solve_time = None
+    error = None
+    try:
+        status, solve_time = ENGINES[engine](
+            filename, stats, preprocess, symmetry, cache, dict(options, budget=budget)
+        )
+    except MemoryError:
+        status = "MEMOUT"
+    except Exception as exc:
+        status = "ERROR"
+        error = f"{type(exc).__name__}: {exc}"
+        print(f"{filename}: {error}", file=sys.stderr)
+        traceback.print_exc()
+
+    row = dict(engine=engine, status=status, time=time.perf_counter() - start, solve_time=solve_time)
+    if error is not None:
+        row["error"] = error
+    row.update(stats.as_dict())
+    row["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return row
+
+
+def _worker(
+    engine: str,
+    options: Dict,
+    preprocess: bool,
+    symmetry: bool,
+    timeout: Optional[float],
+    memory_limit: Optional[int],
+    cache: Optional[str],
+    connection,
+):
+    """
+    Worker process: solve the instances received on the connection, sending
+    back a result row for each, until it receives None.
+    """
+    if memory_limit is not None:
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    formula_cache = FormulaCache(cache) if cache is not None else None
+
+    while True:
+        filename = connection.recv()
+        if filename is None:
+            break
+        connection.send(_run_instance(
+            filename, engine, options, preprocess, symmetry, timeout, memory_limit, formula_cache
+        ))
+    connection.close()
+
+
+def run_batch(
+    instances: List[str],
+    jobs: int,
+    timeout: Optional[float],
+    memory_limit: Optional[int] = None,
+    preprocess: bool = False,
+    engine: str = "main",
+    cache: Optional[str] = None,
+    symmetry: bool = False,
+    **options
+) -> Iterator[Dict]:
+    """
+    Solve the instances with a pool of at most jobs worker processes, each
+    forked from this interpreter, so the solver modules are loaded once, and
+    reused from one instance to the next. Yield a result row per instance as
+    it finishes.
+
+    The solvers stop on their own once they spend timeout seconds, reporting
+    TIMEOUT, or once the worker uses memory_limit MiB, reporting MEMOUT; the
+    memory limit also caps the address space of the workers. A worker that
+    does not stop within GRACE_TIME seconds past the timeout, or that dies,
+    is replaced by a new one. engine names the solver in ENGINES, and
+    options are passed to it. cache is a directory where the parsed formulas
+    are kept between runs (see cache.py). preprocess and symmetry simplify
+    the formulas and add symmetry-breaking clauses before solving.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    pending = list(reversed(instances))
+    idle = []
+    running = {}
+
+    def spawn():
+        connection, child = context.Pipe()
+        process = context.Process(
+            target=_worker,
+            args=(engine, options, preprocess, symmetry, timeout, memory_limit, cache, child),
+            daemon=True
+        )
+        process.start()
+        child.close()
+        return connection, process
+
+    try:
+        while pending or running:
+            while pending and len(running) < jobs:
+                connection, process = idle.pop() if idle else spawn()
+                filename = pending.pop()
+                connection.send(filename)
+                running[connection] = (filename, process, time.perf_counter())
+
+            now = time.perf_counter()
+            wait_time = None
+            if timeout is not None:
+                deadline = min(start for _, _, start in running.values()) + timeout + GRACE_TIME
+                wait_time = max(0.0, deadline - now)
+
+            ready = wait(list(running), timeout=wait_time)
+            now = time.perf_counter()
+            for connection in list(running):
+                filename, process, start = running[connection]
+                answered = False
+                if connection in ready:
+                    try:
+                        row = connection.recv()
+                        answered = True
+                    except EOFError:
+                        # killed without answering, usually by the memory limit
+                        row = dict(engine=engine, time=now - start,
+                                   status="MEMOUT" if memory_limit is not None else "ERROR")
+                elif timeout is not None and now - start >= timeout + GRACE_TIME:
+                    row = dict(engine=engine, status="TIMEOUT", time=now - start)
+                    process.kill()
+                else:
+                    continue
+
+                del running[connection]
+                if answered:
+                    idle.append((connection, process))
+                else:
+                    process.join()
+                    connection.close()
+                yield dict(instance=filename, **row)
+    finally:
+        for connection, _ in idle:
+            connection.send(None)
+        for _, process, _ in running.values():
+            process.kill()
+        workers = idle + [(connection, process) for connection, (_, process, _) in running.items()]
+        for connection, process in workers:
+            process.join()
+            connection.close()
+
+
+def write_rows(rows: List[Dict], filename: str):
+    """
+    Write the result rows as CSV if filename ends in .csv, else as JSON lines.
+    """
+    with open(filename, "w", newline="") as file:
+        if filename.endswith(".csv"):
+            writer = csv.DictWriter(file, fieldnames=FIELDS, restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                file.write(json.dumps(row) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a batch of CNF instances in parallel")
+    parser.add_argument("paths", nargs="+", help="CNF files or directories containing them")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count(),
+                        help="number of instances solved at a time (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, metavar="SECONDS",
+                        help="wall-clock limit per instance")
+    parser.add_argument("--memory-limit", type=int, default=None, metavar="MIB",
+                        help="address space limit per instance")
+    parser.add_argument("--expected", metavar="FILE",
+                        help="expected-results file to check the verdicts against")
+    parser.add_argument("--output", "-o", metavar="FILE",
+                        help="write the results as JSON lines, or CSV if FILE ends in .csv")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="main",
+                        help="solver to run: main.py or back.py (default: main)")
+    parser.add_argument("--restart", choices=RESTART_POLICIES, default="glucose",
+                        help="restart policy (default: glucose)")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="simplify the formulas before solving")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="add symmetry-breaking clauses before solving")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="keep the parsed formulas in DIR, to skip parsing on the next runs")
+    args = parser.parse_args()
+
+    expected = load_expected(args.expected) if args.expected else {}
+    instances = collect_instances(args.paths)
+
+    rows = []
+    mismatches = 0
+    for row in run_batch(instances, args.jobs, args.timeout, args.memory_limit,
+                         preprocess=args.preprocess, engine=args.engine, cache=args.cache,
+                         symmetry=args.symmetry, restart=args.restart):
+        verdict = expected.get(os.path.normpath(row["instance"]))
+        if verdict is not None:
+            row["expected"] = verdict
+            if row["status"] in ("SATISFIABLE", "UNSATISFIABLE"):
+                row["ok"] = row["status"] == verdict
+        if row["status"] == "INVALID_MODEL":
+            row["ok"] = False
+        mismatches += row.get("ok") is False
+        rows.append(row)
+        mark = "WRONG" if row.get("ok") is False else ""
+        print(f"{row['instance']}\t{row['status']}\t{row['time']:.2f}s\t{mark}".rstrip())
+
+    rows.sort(key=lambda row: instances.index(row["instance"]))
+    if args.output:
+        write_rows(rows, args.output)
+
+    counts = {}
+    for row in rows:
+        counts[row["status"]] = counts.get(row["status"], 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"{len(rows)} instances: {summary}, {mismatches} wrong")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import json
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+from batch import ENGINES, collect_instances, run_batch
+
+DEFAULT_SUITES = ("pj1-tests/sat", "pj1-tests/unsat")
+
+# instances faster than this (seconds) in the baseline are too noisy to be
+# compared one by one; they still count in the total
+MIN_COMPARED_TIME = 0.05
+
+
+def benchmark(
+    instances: List[str], engine: str, trials: int, timeout: Optional[float], **options
+) -> Dict[str, Dict]:
+    """
+    Solve every instance trials times, one at a time, and return per instance
+    the median wall time and solving time, the throughput of the median
+    trial and the peak memory over all trials.
+    """
+    runs = {instance: [] for instance in instances}
+    for _ in range(trials):
+        for row in run_batch(instances, 1, timeout, engine=engine, **options):
+            runs[row["instance"]].append(row)
+
+    results = {}
+    for instance, rows in runs.items():
+        solved = [row for row in rows if row["status"] in ("SATISFIABLE", "UNSATISFIABLE")]
+        if len(solved) < len(rows):
+            statuses = {row["status"] for row in rows if row not in solved}
+            results[instance] = dict(status="/".join(sorted(statuses)))
+            continue
+
+        solved.sort(key=lambda row: row["solve_time"])
+        median = solved[len(solved) // 2]
+        solve_time = max(median["solve_time"], 1e-9)
+        results[instance] = dict(
+            status=median["status"],
+            time=statistics.median(row["time"] for row in solved),
+            solve_time=median["solve_time"],
+            conflicts=median["conflicts"],
+            decisions=median["decisions"],
+            propagations=median["propagations"],
+            conflicts_per_second=median["conflicts"] / solve_time,
+            decisions_per_second=median["decisions"] / solve_time,
+            propagations_per_second=median["propagations"] / solve_time,
+            peak_rss_kb=max(row["peak_rss_kb"] for row in solved),
+        )
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Return the regressions of the results against the baseline: instances
+    no longer solved, instances slower than threshold times the baseline,
+    and the same for the total time of the instances solved in both.
+    """
+    regressions = []
+    total, baseline_total = 0.0, 0.0
+    for instance, result in results.items():
+        reference = baseline.get(instance)
+        if reference is None or "time" not in reference:
+            continue
+        if "time" not in result:
+            regressions.append(f"{instance}: {result['status']}, was solved in {reference['time']:.2f}s")
+            continue
+        if result["status"] != reference["status"]:
+            regressions.append(f"{instance}: {result['status']}, was {reference['status']}")
+
+        total += result["time"]
+        baseline_total += reference["time"]
+        ratio = result["time"] / reference["time"]
+        if reference["time"] >= MIN_COMPARED_TIME and ratio > threshold:
+            regressions.append(
+                f"{instance}: {result['time']:.2f}s, was {reference['time']:.2f}s ({ratio:.2f}x)"
+            )
+
+    if baseline_total > 0 and total / baseline_total > threshold:
+        regressions.append(
+            f"total: {total:.2f}s, was {baseline_total:.2f}s ({total / baseline_total:.2f}x)"
+        )
+    return regressions
+
+
+def print_results(engine: str, results: Dict[str, Dict]):
+    print(f"{'instance':40} {'status':>13} {'time':>8} {'confl/s':>9} {'props/s':>10} {'dec/s':>9} {'rss MiB':>8}")
+    for instance, result in results.items():
+        if "time" not in result:
+            print(f"{instance:40} {result['status']:>13}")
+            continue
+        print(
+            f"{instance:40} {result['status']:>13} {result['time']:8.3f} "
+            f"{result['conflicts_per_second']:9.0f} {result['propagations_per_second']:10.0f} "
+            f"{result['decisions_per_second']:9.0f} {result['peak_rss_kb'] / 1024:8.1f}"
+        )
+    solved = [result for result in results.values() if "time" in result]
+    total = sum(result["time"] for result in solved)
+    print(f"{engine}: {len(solved)}/{len(results)} solved, {total:.2f}s total")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solver engines")
+    parser.add_argument("paths", nargs="*", default=list(DEFAULT_SUITES),
+                        help="CNF files or directories (default: pj1-tests/sat and pj1-tests/unsat)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), action="append",
+                        help="engine to benchmark, can be repeated (default: all)")
+    parser.add_argument("--trials", type=int, default=3,
+                        help="runs per instance, the median is reported (default: 3)")
+    parser.add_argument("--timeout", type=float, default=10, metavar="SECONDS",
+                        help="wall-clock limit per run (default: 10)")
+    parser.add_argument("--save-baseline", metavar="FILE",
+                        help="store the results as the new baseline")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare against this baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown factor counted as a regression (default: 1.25)")
+    args = parser.parse_args()
+
+    instances = collect_instances(args.paths)
+    engines = args.engine or sorted(ENGINES)
+
+    results = {}
+    for engine in engines:
+        results[engine] = benchmark(instances, engine, args.trials, args.timeout)
+        print_results(engine, results[engine])
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = []
+        for engine in engines:
+            regressions.extend(
+                f"{engine} {regression}"
+                for regression in compare(results[engine], baseline.get(engine, {}), args.threshold)
+            )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
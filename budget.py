@@ -0,0 +1,113 @@
+import resource
+import signal
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+from stats import Statistics
+
+# the clock and the memory are read once every CHECK_INTERVAL checks, the
+# counters and the interruption flag at every check
+CHECK_INTERVAL = 256
+
+# ru_maxrss is in KiB on Linux, and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+class Unknown(NamedTuple):
+    """
+    Answer of a run stopped before finding a model or proving UNSAT: the
+    reason ("conflicts", "propagations", "time", "memory" or "interrupted")
+    and the best partial assignment met, the true literals of the longest
+    trail found at a conflict.
+    """
+    reason: str
+    partial: List[int]
+
+
+class Budget:
+    """
+    Resource limits of a solver run, checked cooperatively by the search
+    loop, which stops with an Unknown answer once one of them runs out.
+
+    conflicts and propagations cap the counters added to the Statistics of
+    the run after start(), seconds caps its wall-clock time and memory the
+    peak resident set size of the process, in MiB. None means no limit.
+
+    interrupt() stops the run at its next check. It only sets a flag, so it
+    may be called from another thread or from a signal handler; see
+    handle_signals(). start() does not clear the flag, so an interruption
+    that arrives just before a run starts is not lost; reset() does.
+    """
+
+    def __init__(
+        self,
+        conflicts: Optional[int] = None,
+        propagations: Optional[int] = None,
+        seconds: Optional[float] = None,
+        memory: Optional[int] = None,
+    ):
+        self.conflicts = conflicts
+        self.propagations = propagations
+        self.seconds = seconds
+        self.memory = memory
+        self.interrupted = False
+        # why the last run stopped, None while it has not
+        self.reason: Optional[str] = None
+
+        self.conflict_limit = float("inf")
+        self.propagation_limit = float("inf")
+        self.deadline = float("inf")
+        self.checks = 0
+
+    def start(self, stats: Statistics):
+        """
+        Start a run whose counters are collected in stats, which may already
+        hold those of earlier runs.
+        """
+        self.reason = None
+        self.checks = 0
+        inf = float("inf")
+        self.conflict_limit = stats.conflicts + self.conflicts if self.conflicts is not None else inf
+        self.propagation_limit = stats.propagations + self.propagations if self.propagations is not None else inf
+        self.deadline = time.perf_counter() + self.seconds if self.seconds is not None else inf
+
+    def exhausted(self, stats: Statistics) -> bool:
+        """
+        Whether the run must stop, setting reason if so.
+        """
+        if self.interrupted:
+            self.reason = "interrupted"
+        elif stats.conflicts >= self.conflict_limit:
+            self.reason = "conflicts"
+        elif stats.propagations >= self.propagation_limit:
+            self.reason = "propagations"
+        else:
+            self.checks += 1
+            if self.checks < CHECK_INTERVAL:
+                return False
+            self.checks = 0
+            if time.perf_counter() >= self.deadline:
+                self.reason = "time"
+            elif self.memory is not None and \
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT >= self.memory << 20:
+                self.reason = "memory"
+            else:
+                return False
+        return True
+
+    def interrupt(self):
+        self.interrupted = True
+
+    def reset(self):
+        self.interrupted = False
+        self.reason = None
+
+    def handle_signals(self, *signals: int):
+        """
+        Interrupt the run on the given signals (SIGINT and SIGTERM by
+        default) instead of being killed by them. Only the main thread
+        can install signal handlers.
+        """
+        for number in signals or (signal.SIGINT, signal.SIGTERM):
+            signal.signal(number, lambda number, frame: self.interrupt())
@@ -0,0 +1,189 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from typing import NamedTuple
+
+from arena import ClauseArena
+from dimacs import read_dimacs
+
+# format of the entries: entries with another magic number or version
+# are stale, and are parsed again and replaced
+MAGIC = 0x43464e43
+VERSION = 1
+
+# magic, version, num_variables, num_clauses, then the lengths of the
+# indptr, arena data and literals arrays that follow the header
+HEADER = struct.Struct("=8q")
+
+# entries are evicted, least recently used first, above this total size
+DEFAULT_MAX_SIZE = 1 << 30
+
+SUFFIX = ".cnfc"
+
+
+class CachedFormula(NamedTuple):
+    """
+    A cached CNF file: its clause arena, and the clause x literal occurrence
+    index in CSR form, where the literals of clause i are
+    literals[indptr[i]:indptr[i + 1]]. indptr (int64) and literals (int32)
+    are views of the memory-mapped entry, or of the arrays just built on a
+    cache miss.
+    """
+    clauses: ClauseArena
+    indptr: memoryview
+    literals: memoryview
+
+
+class FormulaCache:
+    """
+    On-disk cache of parsed CNF files, keyed by a hash of the file content,
+    so that an edited file never hits a stale entry.
+
+    Each entry is a single binary file: a header, then the occurrence index
+    (int64 offsets, int32 literals) and the arena data (int32), all in the
+    machine's byte order. Entries are memory-mapped when read; the arena
+    data is copied out of the map with a single bulk copy, since the solver
+    appends learnt clauses to it.
+
+    Reading an entry refreshes its modification time, and after a new entry
+    is written the oldest ones are removed until the directory holds at most
+    max_size bytes.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, filename: str) -> str:
+        """
+        Hash of the content of the file, as it is stored (compressed or not).
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        with open(filename, "rb") as file:
+            while True:
+                chunk = file.read(1 << 20)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def read(self, filename: str) -> CachedFormula:
+        """
+        Return the parsed file from the cache, parsing and storing it on a
+        miss or when the entry is stale. Formulas larger than the whole
+        cache, or that can not be written, are parsed but not stored.
+        """
+        path = self.path(self.key(filename))
+        try:
+            entry = self._load(path)
+        except (OSError, ValueError):
+            entry = None
+        if entry is not None:
+            os.utime(path)
+            return entry
+
+        clauses = read_dimacs(filename)
+        data = clauses.data
+        indptr = array("q", [0])
+        literals = array("i")
+        for cref in clauses:
+            start = cref + ClauseArena.HEADER
+            literals.extend(data[start:start + data[cref]])
+            indptr.append(len(literals))
+
+        size = HEADER.size + 8 * len(indptr) + 4 * (len(data) + len(literals))
+        if size <= self.max_size:
+            try:
+                self._store(path, clauses, indptr, literals)
+            except OSError:
+                pass
+        return CachedFormula(clauses, memoryview(indptr), memoryview(literals))
+
+    def _load(self, path: str):
+        """
+        Map an entry, returning None if it is stale or truncated.
+        """
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < HEADER.size:
+            mapped.close()
+            return None
+        magic, version, num_variables, num_clauses, indptr_size, data_size, literals_size, _ = \
+            HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION \
+                or len(mapped) != HEADER.size + 8 * indptr_size + 4 * (data_size + literals_size):
+            mapped.close()
+            return None
+
+        view = memoryview(mapped)
+        start = HEADER.size
+        indptr = view[start:start + 8 * indptr_size].cast("q")
+        start += 8 * indptr_size
+        clauses = ClauseArena()
+        clauses.data.frombytes(view[start:start + 4 * data_size])
+        clauses.num_variables = num_variables
+        clauses.num_clauses = num_clauses
+        start += 4 * data_size
+        literals = view[start:start + 4 * literals_size].cast("i")
+        return CachedFormula(clauses, indptr, literals)
+
+    def _store(self, path: str, clauses: ClauseArena, indptr: array, literals: array):
+        """
+        Write an entry through a temporary file, so that readers never see
+        a partial entry, then evict old entries. The temporary file is
+        removed if the write fails.
+        """
+        data = clauses.data
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                file.write(HEADER.pack(
+                    MAGIC, VERSION, clauses.num_variables, clauses.num_clauses,
+                    len(indptr), len(data), len(literals), 0
+                ))
+                indptr.tofile(file)
+                data.tofile(file)
+                literals.tofile(file)
+            os.replace(temporary, path)
+        except OSError:
+            # a temporary file left behind would never be evicted
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+        self._evict(keep=path)
+
+    def _evict(self, keep: str):
+        """
+        Remove the least recently used entries, other than keep, while the
+        cache is larger than max_size.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,213 @@
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+
+from arena import ClauseArena
+
+# at-most-k constraints are looked for up to this bound: their encoding
+# takes a clause of k + 1 literals per (k + 1)-subset of the constraint
+MAX_BOUND = 3
+
+# the deadline is checked every this many clauses or sets
+CHECK_INTERVAL = 4096
+
+
+def find_cardinality(
+    clauses: ClauseArena,
+    max_bound: int = MAX_BOUND,
+    budget: float = 1.0
+) -> Tuple[List[Tuple[List[int], int]], Set[int]]:
+    """
+    Recover the at-most-k constraints encoded in the original clauses. At
+    most k of the literals l1..ln are true when, for every k + 1 of them,
+    the clause of their negations is present: pairwise binary clauses for
+    at-most-one, which are the cliques of the graph joining the negations
+    of the literals of every binary clause.
+
+    Constraints are grown greedily from every clause not yet covered, those
+    of the literals that occur most first, and kept if they have at least
+    k + 2 literals, replacing more than one clause. Each clause is covered
+    by at most one constraint. Bounds are searched from 1 up, and the search
+    stops once the time budget (in seconds) is spent, keeping the
+    constraints already found. Return the constraints, as their literals
+    and k, and the crefs of the clauses they cover.
+    """
+    deadline = time.monotonic() + budget
+    constraints = []
+    covered = set()
+
+    # the clauses of up to max_bound + 1 literals, as the sets of literals
+    # they forbid to be all true
+    forbidden: Dict[frozenset, List[int]] = defaultdict(list)
+    for i, cref in enumerate(clauses):
+        if i % CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+            return constraints, covered
+        if clauses.learnt(cref) or not 2 <= clauses.size(cref) <= max_bound + 1:
+            continue
+        literals = frozenset(-literal for literal in clauses.literals(cref))
+        if len(literals) < 2 or any(-literal in literals for literal in literals):
+            continue
+        forbidden[literals].append(cref)
+
+    for bound in range(1, max_bound + 1):
+        # the sets that can be in a constraint: in one of k + 2 literals or
+        # more, every k literals of a set are also in another set, which
+        # rules out most clauses of random formulas
+        sized = [literals for literals in forbidden if len(literals) == bound + 1]
+        shared = Counter()
+        for first in range(0, len(sized), CHECK_INTERVAL):
+            if time.monotonic() > deadline:
+                return constraints, covered
+            shared.update(frozenset(subset) for literals in sized[first:first + CHECK_INTERVAL]
+                          for subset in combinations(literals, bound))
+        uncovered = {
+            literals for literals in sized
+            if all(shared[frozenset(subset)] > 1 for subset in combinations(literals, bound))
+        }
+        # and the sets containing every literal
+        occurs: Dict[int, Set[frozenset]] = defaultdict(set)
+        for literals in uncovered:
+            for literal in literals:
+                occurs[literal].add(literals)
+        degree = {literal: len(sets) for literal, sets in occurs.items()}
+
+        # the seeds are the sets of every literal, in decreasing degree
+        tried = set()
+        for literal in sorted(occurs, key=lambda literal: (-degree[literal], literal)):
+            for seed in list(occurs[literal]):
+                if seed in tried or seed not in uncovered:
+                    continue
+                if len(tried) % CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                    return constraints, covered
+                tried.add(seed)
+                group = _grow(seed, bound, uncovered, occurs, degree)
+                if len(group) < bound + 2:
+                    continue
+                for subset in combinations(group, bound + 1):
+                    literals = frozenset(subset)
+                    uncovered.discard(literals)
+                    for other in literals:
+                        occurs[other].discard(literals)
+                    covered.update(forbidden[literals])
+                constraints.append((sorted(group, key=abs), bound))
+    return constraints, covered
+
+
+def _grow(
+    seed: frozenset,
+    bound: int,
+    uncovered: Set[frozenset],
+    occurs: Dict[int, Set[frozenset]],
+    degree: Dict[int, int]
+) -> List[int]:
+    """
+    Extend the literals of seed with every literal that forms an uncovered
+    set with each bound of the literals already taken.
+    """
+    group = sorted(seed, key=lambda literal: (-degree[literal], literal))
+    # a literal that joins the group forms a set with its last bound literals
+    base = frozenset(group[1:])
+    candidates = {literal for literals in occurs[group[-1]] if base < literals for literal in literals - base}
+    candidates -= seed
+    for candidate in sorted(candidates, key=lambda literal: (-degree[literal], literal)):
+        if all(frozenset(subset) | {candidate} in uncovered for subset in combinations(group, bound)):
+            group.append(candidate)
+    return group
+
+
+class Cardinality:
+    """
+    Native at-most-k constraints, as a propagator next to the clause
+    watches.
+
+    Every constraint keeps its literals that are true and have been
+    propagated, in propagation order, and their number is its counter.
+    count() is called for each literal the solver propagates, and returns
+    the constraints whose counter reached their bound, for propagate() to
+    set the other literals false, or report a conflict if more than k are
+    true. uncount() undoes count() for the literals unassigned by a
+    backtrack, latest first.
+
+    Implied values get no reason clause when they are set: explanations
+    keeps, for every variable implied false, the k true literals that
+    implied it, so that the reason clause can be built only if conflict
+    analysis reaches it. A conflict is left in conflict, as its clause.
+    """
+
+    def __init__(self, constraints: List[Tuple[List[int], int]], num_variables: int):
+        self.literals = [literals for literals, _ in constraints]
+        self.bounds = [bound for _, bound in constraints]
+        self.true: List[List[int]] = [[] for _ in constraints]
+
+        # the constraints of every literal, indexed like the watch lists
+        self.occurs: List[List[int]] = [[] for _ in range(2 * num_variables + 1)]
+        for constraint, literals in enumerate(self.literals):
+            for literal in literals:
+                self.occurs[literal].append(constraint)
+
+        self.explanations: List[Optional[Tuple[int, ...]]] = [None] * (num_variables + 1)
+        self.conflict: List[int] = []
+
+    def __len__(self):
+        return len(self.literals)
+
+    def grow(self, num_variables: int):
+        """
+        Make room for literals of variables up to num_variables, which are
+        in no constraint. The negative literals are indexed from the end.
+        """
+        old = len(self.explanations) - 1
+        if num_variables <= old:
+            return
+        occurs = [[] for _ in range(2 * num_variables + 1)]
+        for var in range(1, old + 1):
+            occurs[var] = self.occurs[var]
+            occurs[-var] = self.occurs[-var]
+        self.occurs = occurs
+        self.explanations.extend([None] * (num_variables - old))
+
+    def count(self, literal: int) -> List[int]:
+        """
+        Count the literal, which just became true, in its constraints, and
+        return those that reached their bound.
+        """
+        true = self.true
+        bounds = self.bounds
+        reached = []
+        for constraint in self.occurs[literal]:
+            true[constraint].append(literal)
+            if len(true[constraint]) >= bounds[constraint]:
+                reached.append(constraint)
+        return reached
+
+    def uncount(self, literals: List[int]):
+        """
+        Undo count() for the literals, given in propagation order.
+        """
+        true = self.true
+        occurs = self.occurs
+        for literal in reversed(literals):
+            for constraint in occurs[literal]:
+                true[constraint].pop()
+
+    def propagate(self, constraint: int, values: List[int]) -> Optional[List[int]]:
+        """
+        Return the literals implied by a constraint that reached its bound,
+        for the values of the variables (var, -var or 0), or None on a
+        conflict, made of the last k + 1 true literals counted.
+        """
+        bound = self.bounds[constraint]
+        true = self.true[constraint]
+        if len(true) > bound:
+            self.conflict = [-literal for literal in true[-bound - 1:]]
+            return None
+
+        explanation = tuple(true)
+        explanations = self.explanations
+        implied = []
+        for literal in self.literals[constraint]:
+            if values[abs(literal)] == 0:
+                explanations[abs(literal)] = explanation
+                implied.append(-literal)
+        return implied
@@ -0,0 +1,142 @@
+import bz2
+import gzip
+import lzma
+import mmap
+from array import array
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+from arena import ClauseArena
+
+# bytes read from the input at a time
+CHUNK_SIZE = 1 << 20
+
+# first bytes of each supported compressed format
+MAGIC_OPENERS = (
+    (b"\x1f\x8b", gzip.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+    (b"BZh", bz2.open),
+)
+
+
+def open_cnf(filename: str) -> BinaryIO:
+    """
+    Open a CNF file for binary reading, decompressing .gz, .xz and .bz2
+    inputs transparently. The format is detected from the file content,
+    so the extension does not matter.
+    """
+    with open(filename, "rb") as file:
+        magic = file.read(6)
+
+    for prefix, opener in MAGIC_OPENERS:
+        if magic.startswith(prefix):
+            return opener(filename, "rb")
+
+    return open(filename, "rb")
+
+
+def read_chunks(filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the (decompressed) content of a file in chunks of bounded size.
+    Plain files are memory-mapped instead of read.
+    """
+    with open_cnf(filename) as file:
+        if isinstance(file, (gzip.GzipFile, lzma.LZMAFile, bz2.BZ2File)):
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can not be mapped
+            return
+        with mapped:
+            for start in range(0, len(mapped), chunk_size):
+                yield mapped[start:start + chunk_size]
+
+
+def _clause_lines(chunk: bytes) -> Tuple[bytes, bool]:
+    """
+    Drop comment and problem lines from a chunk of whole lines.
+    Also return whether the chunk holds the SATLIB "%" end marker.
+    """
+    if b"c" not in chunk and b"p" not in chunk and b"%" not in chunk:
+        return chunk, False
+
+    kept = []
+    for line in chunk.split(b"\n"):
+        first = line.lstrip()[:1]
+        if first == b"%":
+            return b"\n".join(kept), True
+        if first != b"c" and first != b"p":
+            kept.append(line)
+    return b"\n".join(kept), False
+
+
+def parse_dimacs(chunks: Iterable[bytes], clauses: Optional[ClauseArena] = None) -> ClauseArena:
+    """
+    Parse DIMACS CNF text, given as chunks of bytes, into a clause arena.
+    Clauses may span lines and chunks, and a line may hold many clauses.
+    Duplicated literals in a clause are removed.
+    """
+    if clauses is None:
+        clauses = ClauseArena()
+
+    tail = b""
+    pending = array("i")
+    finished = False
+    for chunk in chunks:
+        chunk = tail + chunk
+        end = chunk.rfind(b"\n") + 1
+        tail = chunk[end:]
+        text, finished = _clause_lines(chunk[:end])
+        pending = _add_clauses(clauses, pending, text)
+        if finished:
+            break
+
+    if not finished:
+        text, _ = _clause_lines(tail)
+        pending = _add_clauses(clauses, pending, text)
+    if len(pending) > 0:
+        # the last clause is missing its terminating 0
+        pending.append(0)
+        clauses.extend(_split_clauses(pending, len(pending)))
+
+    return clauses
+
+
+def read_dimacs(filename: str, clauses: Optional[ClauseArena] = None) -> ClauseArena:
+    """
+    Stream a (possibly compressed) DIMACS CNF file into a clause arena.
+    """
+    return parse_dimacs(read_chunks(filename), clauses)
+
+
+def _add_clauses(clauses: ClauseArena, pending: array, text: bytes) -> array:
+    """
+    Add every 0-terminated clause of text, prefixed by the pending literals
+    of the previous chunk. Return the literals left without a terminator.
+    """
+    literals = pending + array("i", map(int, text.split()))
+    end = len(literals)
+    while end > 0 and literals[end - 1] != 0:
+        end -= 1
+
+    clauses.extend(_split_clauses(literals, end))
+    return literals[end:]
+
+
+def _split_clauses(literals: array, end: int) -> Iterator[array]:
+    """
+    Yield the 0-terminated clauses of literals[:end], without duplicates.
+    """
+    start = 0
+    while start < end:
+        stop = literals.index(0, start)
+        clause = literals[start:stop]
+        if len(set(clause)) != len(clause):
+            clause = array("i", dict.fromkeys(clause))
+        yield clause
+        start = stop + 1
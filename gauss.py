@@ -0,0 +1,186 @@
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from arena import ClauseArena
+
+# XORs over more variables than this are not looked for: their encoding
+# takes 2 ** (size - 1) clauses
+XOR_MAX_SIZE = 6
+
+
+def find_xors(clauses: ClauseArena, max_size: int = XOR_MAX_SIZE) -> List[Tuple[List[int], int]]:
+    """
+    Recover the XOR constraints encoded in the original clauses. The XOR
+    x1 ^ ... ^ xk = rhs is encoded by the 2 ** (k - 1) clauses over x1..xk
+    that each forbid one assignment of the wrong parity: those whose number
+    of negative literals has the parity of 1 - rhs. Return every XOR whose
+    clauses are all present, as its sorted variables and rhs (0 or 1).
+    """
+    # sign patterns of the clauses over each set of variables, as bitmasks
+    # of the negative literals in the sorted variable order
+    patterns = defaultdict(set)
+    for cref in clauses:
+        if clauses.learnt(cref):
+            continue
+        literals = set(clauses.literals(cref))
+        if not 2 <= len(literals) <= max_size or any(-var in literals for var in literals):
+            continue
+        literals = sorted(literals, key=abs)
+        mask = 0
+        for i, literal in enumerate(literals):
+            if literal < 0:
+                mask |= 1 << i
+        patterns[tuple(abs(literal) for literal in literals)].add(mask)
+
+    xors = []
+    for variables, masks in patterns.items():
+        needed = 1 << (len(variables) - 1)
+        if len(masks) < needed:
+            continue
+        for parity in (0, 1):
+            if sum(1 for mask in masks if bin(mask).count("1") % 2 == parity) == needed:
+                xors.append((list(variables), 1 - parity))
+    return xors
+
+
+def _parity(words: np.ndarray) -> np.ndarray:
+    """
+    Parity of the set bits of every row of a uint64 matrix.
+    """
+    folded = np.bitwise_xor.reduce(words, axis=1) if words.shape[1] > 0 else np.zeros(len(words), np.uint64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        folded ^= folded >> np.uint64(shift)
+    return (folded & np.uint64(1)).astype(np.uint8)
+
+
+class GaussEngine:
+    """
+    Gauss-Jordan elimination over the XOR constraints, as a propagator next
+    to the clause watches.
+
+    The XORs are rows of a GF(2) matrix over their variables, bit-packed in
+    uint64 words, with a right-hand side bit per row. The matrix is brought
+    to reduced row echelon form once, dropping dependent rows; an
+    inconsistent system (0 = 1) makes the formula UNSAT at level 0.
+
+    propagate() takes the current values and eliminates again over the
+    unassigned columns, starting from the rows whose pivot was assigned, as
+    the others are still reduced. A row left with no unassigned variable and
+    rhs 1 is a conflict, and one left with a single unassigned variable
+    implies its value. Both are returned as clauses, so that the solver can
+    keep them as reasons for conflict analysis: the implied literal or
+    nothing, then the negation of the current value of every other variable
+    of the row.
+    """
+
+    def __init__(self, xors: List[Tuple[List[int], int]]):
+        self.variables = sorted({var for variables, _ in xors for var in variables})
+        column = {var: i for i, var in enumerate(self.variables)}
+        num_columns = len(self.variables)
+        self.num_words = (num_columns + 63) // 64
+
+        bits = np.zeros((len(xors), 64 * self.num_words), dtype=np.uint8)
+        for i, (variables, _) in enumerate(xors):
+            bits[i, [column[var] for var in variables]] = 1
+        rows = self._pack(bits)
+        rhs = np.array([rhs for _, rhs in xors], dtype=np.uint8)
+
+        # reduced row echelon form, and the pivot column of every row
+        self.inconsistent = False
+        pivots = []
+        done = np.zeros(len(rows), dtype=bool)
+        for _ in range(len(rows)):
+            candidates = np.flatnonzero(~done & rows.any(axis=1))
+            if len(candidates) == 0:
+                break
+            pivot = self._eliminate(rows, rhs, rows, candidates[0])
+            done[candidates[0]] = True
+            pivots.append((candidates[0], pivot))
+        if np.any(~rows.any(axis=1) & (rhs == 1)):
+            self.inconsistent = True
+
+        order = [row for row, _ in pivots]
+        self.rows = rows[order]
+        self.rhs = rhs[order]
+        self.pivots = np.array([pivot for _, pivot in pivots], dtype=np.int64)
+
+        # the assignment of the last call, which had nothing to report
+        self.last = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _pack(self, bits: np.ndarray) -> np.ndarray:
+        """
+        Pack rows of 0/1 bytes into little-endian uint64 words.
+        """
+        return np.packbits(bits, axis=-1, bitorder="little").view("<u8").reshape(*bits.shape[:-1], self.num_words)
+
+    def _columns(self, row: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(row.view(np.uint8), bitorder="little"))
+
+    @staticmethod
+    def _eliminate(rows: np.ndarray, rhs: np.ndarray, free: np.ndarray, row: int) -> int:
+        """
+        Pivot on the lowest set bit of free[row], clearing that column from
+        every other row. free is rows, or the unassigned part of rows, and is
+        updated along with them. Return the pivot column.
+        """
+        word = int(np.flatnonzero(free[row])[0])
+        value = int(free[row, word])
+        bit = np.uint64(value & -value)
+        hit = (free[:, word] & bit) != 0
+        hit[row] = False
+        if free is not rows:
+            free[hit] ^= free[row]
+        rows[hit] ^= rows[row]
+        rhs[hit] ^= rhs[row]
+        return 64 * word + (value & -value).bit_length() - 1
+
+    def propagate(self, values: List[int]) -> Tuple[Optional[List[int]], List[List[int]]]:
+        """
+        Return a conflict clause or None, and the clauses of the implied
+        literals, for the values of the variables (var, -var or 0).
+        """
+        if self.inconsistent:
+            return [], []
+        variables = self.variables
+        current = np.fromiter((values[var] for var in variables), dtype=np.int64, count=len(variables))
+        padding = 64 * self.num_words - len(variables)
+        assigned = self._pack(np.concatenate((current != 0, np.zeros(padding, dtype=bool))))
+        true = self._pack(np.concatenate((current > 0, np.zeros(padding, dtype=bool))))
+        key = assigned.tobytes() + true.tobytes()
+        if key == self.last:
+            return None, []
+
+        rows = self.rows.copy()
+        rhs = self.rhs ^ _parity(rows & true)
+        free = rows & ~assigned
+
+        # rows with an unassigned pivot are still reduced, the others get
+        # new pivots among their unassigned columns
+        for row in np.flatnonzero(current[self.pivots] != 0):
+            if free[row].any():
+                self._eliminate(rows, rhs, free, row)
+
+        folded = np.bitwise_or.reduce(free, axis=1)
+        single = ((free != 0).sum(axis=1) == 1) & ((folded & (folded - np.uint64(1))) == 0)
+        empty = ~free.any(axis=1)
+
+        for row in np.flatnonzero(empty & (rhs == 1)):
+            return [-values[variables[column]] for column in self._columns(rows[row])], []
+
+        self.last = key
+        implied = []
+        for row in np.flatnonzero(single):
+            word = int(np.flatnonzero(free[row])[0])
+            column = 64 * word + int(free[row, word]).bit_length() - 1
+            var = variables[column]
+            clause = [var if rhs[row] else -var]
+            clause.extend(-values[variables[other]] for other in self._columns(rows[row]) if other != column)
+            implied.append(clause)
+        if implied:
+            self.last = None
+        return None, implied
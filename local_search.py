@@ -0,0 +1,185 @@
+import random
+from typing import List, Optional
+
+import numpy as np
+
+from arena import ClauseArena
+
+# probSAT polynomial break distribution: a variable whose flip falsifies
+# b clauses is picked with weight (EPS + b) ** -CB (values tuned for 3-SAT)
+CB = 2.06
+EPS = 0.9
+
+
+class ProbSAT:
+    """
+    probSAT stochastic local search over the original clauses of an arena.
+
+    Starting from a complete assignment, it repeatedly picks a random false
+    clause and flips one of its variables, chosen with a probability given
+    by its break count: the number of clauses that the flip would make false.
+
+    When a search starts, the number of true literals of every clause, the
+    XOR of its true variables (the critical variable, when only one literal
+    is true) and the break counts are computed with NumPy. Each flip then
+    updates them incrementally, visiting only the clauses of the flipped
+    variable. Duplicate literals are merged and tautologies dropped, so that
+    the XOR of the true variables stays exact.
+
+    Assignments are lists indexed by variable, holding var or -var like the
+    variable values of the CDCL solver.
+    """
+
+    def __init__(self, clauses: ClauseArena, seed: int = 0, cb: float = CB, eps: float = EPS):
+        self.num_variables = clauses.num_variables
+        self.rng = random.Random(seed)
+
+        self.clauses: List[List[int]] = []
+        self.empty = False
+        for cref in clauses:
+            if clauses.learnt(cref):
+                continue
+            literals = list(dict.fromkeys(clauses.literals(cref)))
+            if any(-var in literals for var in literals):
+                continue
+            if not literals:
+                self.empty = True
+            self.clauses.append(literals)
+
+        # Flat literals, the clause of each one and where each clause starts
+        sizes = np.array([len(literals) for literals in self.clauses], dtype=np.int64)
+        self.literals = np.fromiter(
+            (var for literals in self.clauses for var in literals), dtype=np.int64, count=int(sizes.sum())
+        )
+        self.clause_of = np.repeat(np.arange(len(self.clauses)), sizes)
+        self.starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+
+        # occurrences[literal] are the clauses containing it, negative
+        # literals are indexed from the end of the list
+        order = np.argsort(self.literals, kind="stable")
+        counts = np.bincount(self.literals[order] + self.num_variables, minlength=2 * self.num_variables + 1)
+        groups = np.split(self.clause_of[order], np.cumsum(counts)[:-1])
+        self.occurrences: List[List[int]] = [[] for _ in range(2 * self.num_variables + 1)]
+        for offset, group in enumerate(groups):
+            if len(group) > 0:
+                self.occurrences[offset - self.num_variables] = group.tolist()
+
+        # weights[b] of every possible break count b
+        largest = max(counts[:self.num_variables].max(initial=0), counts[self.num_variables:].max(initial=0))
+        self.weights = [(eps + b) ** -cb for b in range(int(largest) + 1)]
+
+        self.flips = 0
+        # best assignment met by the last search, and its number of false clauses
+        self.best: Optional[List[int]] = None
+        self.best_unsatisfied = len(self.clauses)
+
+    def search(self, values: Optional[List[int]] = None, max_flips: Optional[int] = None) -> bool:
+        """
+        Search from the assignment values, or from a random one. Variables
+        without a value (0) get a random one. Stop after max_flips flips, if
+        given. Return True if every clause became true: best is then a model.
+        """
+        self.best = None
+        self.best_unsatisfied = len(self.clauses)
+        if self.empty:
+            return False
+        num_variables = self.num_variables
+        rng = self.rng
+        if values is None:
+            values = [0] * (num_variables + 1)
+        value = [
+            var if values[var] == var or (values[var] == 0 and rng.random() < 0.5) else -var
+            for var in range(num_variables + 1)
+        ]
+
+        # Initial counters, for all clauses at once
+        literals = self.literals
+        assignment = np.array(value, dtype=np.int64)
+        true = assignment[np.abs(literals)] == literals
+        true_count = np.bincount(self.clause_of[true], minlength=len(self.clauses))
+        critical = np.bitwise_xor.reduceat(np.where(true, np.abs(literals), 0), self.starts) \
+            if len(self.clauses) > 0 else np.zeros(0, dtype=np.int64)
+        breaks = np.bincount(critical[true_count == 1], minlength=num_variables + 1)
+
+        count = true_count.tolist()
+        critical = critical.tolist()
+        breaks = breaks.tolist()
+        unsatisfied = np.flatnonzero(true_count == 0).tolist()
+        position = [-1] * len(self.clauses)
+        for i, clause in enumerate(unsatisfied):
+            position[clause] = i
+
+        # The best assignment of this search is rebuilt at the end, from the
+        # initial one and the flipped variables, instead of copied each time
+        initial = list(value)
+        flipped = []
+        best_flips = 0
+        best_unsatisfied = len(unsatisfied)
+
+        clauses = self.clauses
+        occurrences = self.occurrences
+        weights = self.weights
+        random_value = rng.random
+        while unsatisfied:
+            if len(unsatisfied) < best_unsatisfied:
+                best_unsatisfied = len(unsatisfied)
+                best_flips = len(flipped)
+            if max_flips is not None and len(flipped) >= max_flips:
+                break
+
+            # A variable of a random false clause, drawn by its break count
+            clause = clauses[unsatisfied[int(random_value() * len(unsatisfied))]]
+            scores = [weights[breaks[abs(var)]] for var in clause]
+            threshold = random_value() * sum(scores)
+            var = clause[-1]
+            for k in range(len(clause)):
+                threshold -= scores[k]
+                if threshold <= 0:
+                    var = clause[k]
+                    break
+            var = abs(var)
+            flipped.append(var)
+
+            # The literal of var that becomes true, and the one that becomes false
+            made = -value[var]
+            value[var] = made
+            for c in occurrences[made]:
+                n = count[c]
+                count[c] = n + 1
+                if n == 0:
+                    last = unsatisfied.pop()
+                    if last != c:
+                        unsatisfied[position[c]] = last
+                        position[last] = position[c]
+                    position[c] = -1
+                    breaks[var] += 1
+                elif n == 1:
+                    breaks[critical[c]] -= 1
+                critical[c] ^= var
+            for c in occurrences[-made]:
+                n = count[c] - 1
+                count[c] = n
+                critical[c] ^= var
+                if n == 0:
+                    position[c] = len(unsatisfied)
+                    unsatisfied.append(c)
+                    breaks[var] -= 1
+                elif n == 1:
+                    breaks[critical[c]] += 1
+
+        self.flips += len(flipped)
+        if not unsatisfied:
+            self.best = value
+            self.best_unsatisfied = 0
+            return True
+        for var in flipped[:best_flips]:
+            initial[var] = -initial[var]
+        self.best = initial
+        self.best_unsatisfied = best_unsatisfied
+        return False
+
+    def model(self) -> List[int]:
+        """
+        The values of the best assignment, as a list of literals.
+        """
+        return self.best[1:]
@@ -1,327 +1,1270 @@
-
+import argparse
+import random
 import sys
-from dataclasses import dataclass
-from typing import Optional, Iterator, Any
-import itertools
+import time
+from typing import Callable, Iterable, Optional
+from arena import ClauseArena
+from budget import Budget, Unknown
+from cache import FormulaCache
+from cardinality import Cardinality, find_cardinality
+from dimacs import read_dimacs
+from portfolio import solve_portfolio
+from preprocess import Preprocessor
+from proof import DratWriter
+from restarts import RESTART_POLICIES, make_restart_policy
+from stats import Statistics
+from symmetry import SymmetryBreaker
+from vsids import VariableHeap
 
-def load_file(filename: str):
-    lines = open(filename, "r").readlines()
+# Parâmetros da redução da base de clausulas aprendidas
+# A primeira redução acontece após FIRST_REDUCE conflitos, e o intervalo
+# entre reduções cresce REDUCE_INCREMENT conflitos a cada redução
+# Clausulas com LBD até GLUE_LBD ("glue") nunca são removidas
+FIRST_REDUCE = 2000
+REDUCE_INCREMENT = 300
+GLUE_LBD = 2
 
-    num_clauses = None
+# Flips de cada rajada de busca local no modo híbrido (--hybrid)
+LOCAL_SEARCH_FLIPS = 50000
 
-    current_line = 0
-    while True:
-        parts = " ".join(lines[current_line].split()).split(" ")
-        current_line += 1
+# Razão dos valores implicados pelas restrições de cardinalidade, cuja
+# clausula só é gerada quando o explain precisa dela (ver _lazy_reason())
+# Também é a clausula de conflito devolvida pelo propagate() quando o
+# conflito é de uma dessas restrições
+LAZY_REASON = -1
 
-        if parts[0] == "p":
-            num_clauses = int(parts[3])
-            break
+# Polaridades iniciais possíveis das variáveis, antes do phase saving
+POLARITIES = ("positive", "negative", "random")
 
-    clauses: list[Clause] = []
-    while num_clauses > 0:
-        if lines[current_line][0] == "c":
-            current_line += 1
-            continue
+# Chamada quando o literal observado false_literal da clausula cref se torna falso
+# Os literais observados são sempre os dois primeiros da clausula na arena
+# Procura outro literal não falso para observar no lugar dele
+# Retorna True se o literal observado foi trocado
+def set_literal(
+    data,
+    cref: int,
+    false_literal: int,
+    variable_values: list[int]
+) -> bool:
+    start = cref + ClauseArena.HEADER
+    if data[start] == false_literal:
+        data[start] = data[start + 1]
+        data[start + 1] = false_literal
+
+    # Se o outro literal observado já é verdadeiro, nada a fazer
+    first = data[start]
+    if variable_values[abs(first)] == first:
+        return False
+
+    for i in range(start + 2, start + data[cref]):
+        literal = data[i]
+        if variable_values[abs(literal)] != -literal:
+            data[start + 1] = literal
+            data[i] = false_literal
+            return True
+
+    return False
+
+
+# Pilha de decisão (trail)
+# Cada elemento é o valor de uma variável, na ordem em que foram definidos
+# reason guarda, para cada variável, None se o valor veio de uma decisão
+# ou a clausula (cref) que causou a propagação (LAZY_REASON se ela ainda
+# não foi gerada)
+# Também guarda a cabeça de propagação: os valores antes de head
+# já tiveram suas listas de observação visitadas
+# level_starts guarda onde começa cada nível de decisão na pilha,
+# e level o nível de decisão em que cada variável foi definida
+# phase guarda o último valor de cada variável (phase saving),
+# começando pelo positivo
+class DecisionStack(list):
+    __slots__ = ("head", "level_starts", "level", "reason", "seen", "phase")
 
-        literals = [int(value) for value in " ".join(lines[current_line].split()).split(" ")[:-1]]
-        clauses.append(Clause(set(literals), []))
-        current_line += 1
-        num_clauses -= 1
-
-    return clauses
-
-
-# Classe de uma clausula
-# Responsável pela otimização de 2 watched literals
-@dataclass
-class Clause:
-    set_literals: set[int]
-    unset_literals: set[int]
-    watched_literals: list[int]
-
-    def __init__(self, literals: set[int], decision_stack: list[tuple[int, Optional[Any]]]):
-        self.unset_literals = literals
-        self.set_literals = set()
-        self.watched_literals = []
-
-        while len(self.watched_literals) < 2 and len(self.unset_literals) > 0:
-            value = next(iter(self.unset_literals))
-            self.watched_literals.append(value)
-            self.unset_literals.remove(value)
-
-        for lit, _ in decision_stack:
-            self.set_literal(lit)
-    
-    def set_literal(self, literal: int):
-        if -literal in self.watched_literals:
-            self.watched_literals.remove(-literal)
-            self.set_literals.add(-literal)
-        elif literal in self.unset_literals:
-            self.unset_literals.remove(literal)
-            self.unset_literals.add(self.watched_literals.pop())
-            self.watched_literals.append(literal)
-        elif -literal in self.unset_literals:
-            self.unset_literals.remove(-literal)
-            self.set_literals.add(-literal)
-
-        while len(self.watched_literals) < 2 and len(self.unset_literals) > 0:
-            value = next(iter(self.unset_literals))
-            self.watched_literals.append(value)
-            self.unset_literals.remove(value)
-    
-    def unset_literal(self, literal: int):
-        if -literal in self.set_literals:
-            self.set_literals.remove(-literal)
-            self.unset_literals.add(-literal)
-        
-        while len(self.watched_literals) < 2 and len(self.unset_literals) > 0:
-            value = next(iter(self.unset_literals))
-            self.watched_literals.append(value)
-            self.unset_literals.remove(value)
-
-    def __len__(self) -> int:
-        return len(self.watched_literals) + len(self.unset_literals) + len(self.set_literals)
-
-    def __iter__(self) -> Iterator[int]:
-        return itertools.chain(iter(self.watched_literals), iter(self.unset_literals), iter(self.set_literals))
-
-    def __contains__(self, item: int) -> bool:
-        return item in self.watched_literals or item in self.unset_literals or item in self.set_literals
-
-
-def join_clauses(a: Iterator[int], b: Iterator[int]):
-    joined = set()
-    for v in a:
-        if -v not in b:
-            joined.add(v)
-    for v in b:
-        if -v not in a:
-            joined.add(v)
-    return joined
+    def __init__(self, num_variables: int):
+        super().__init__()
+        self.head = 0
+        self.level_starts = []
+        self.level = [0 for _ in range(num_variables + 1)]
+        self.reason = [None for _ in range(num_variables + 1)]
+        self.phase = [var for var in range(num_variables + 1)]
+
+        # Marcações usadas pelo explain, sempre limpas ao final
+        self.seen = [False for _ in range(num_variables + 1)]
+
+    def decision_level(self) -> int:
+        return len(self.level_starts)
 
 
 # Equivalente à regra de explain lecionada em aulas
+# Resolve a clausula de conflito com as razões dos valores do último nível,
+# do topo da pilha para baixo, até sobrar um único literal desse nível (1-UIP)
+# Retorna os literais da clausula aprendida, com o literal do 1-UIP na primeira
+# posição e um literal do maior nível restante na segunda, e o nível do backjump
+# As clausulas usadas são marcadas com o número do conflito, para a redução
+# A clausula aprendida é minimizada: saem os literais implicados pelos demais
+# Se subsumed for dado, recebe as clausulas aprendidas que são subsumidas por um
+# resolvente intermediário (subsunção on-the-fly), junto com os literais desse
+# resolvente, que podem substituí-las (ver strengthen())
+# lazy_reason gera a clausula de uma razão LAZY_REASON, dada a variável
 def explain(
-    decision_stack: list[tuple[int, Optional[Clause]]],
-    conflict_clause: set[int]
+    clauses: ClauseArena,
+    decision_stack: DecisionStack,
+    conflict_clause: int,
+    conflicts: int,
+    subsumed: Optional[list[tuple[int, list[int]]]] = None,
+    lazy_reason: Optional[Callable[[int], int]] = None
 ):
-    for i in range(len(decision_stack) - 1, -1, -1):
-        var, reason_clause = decision_stack[i]
-        if -var not in conflict_clause or reason_clause is None:
-            continue
-        
-        conflict_clause = join_clauses(conflict_clause, reason_clause)
-    
-    return Clause(conflict_clause, decision_stack)
+    current_level = decision_stack.decision_level()
+    if current_level == 0:
+        return [], -1
+
+    data = clauses.data
+    level = decision_stack.level
+    reason = decision_stack.reason
+    seen = decision_stack.seen
+
+    learned = [0]
+    pending = 0
+    reason_clause = conflict_clause
+    value = 0
+    i = len(decision_stack) - 1
+    while True:
+        if reason_clause == LAZY_REASON:
+            reason_clause = lazy_reason(abs(value))
+        data[reason_clause + ClauseArena.USED] = conflicts
+        start = reason_clause + ClauseArena.HEADER
+        in_reason = 0
+        for k in range(start, start + data[reason_clause]):
+            var = data[k]
+            if var == value or level[abs(var)] == 0:
+                continue
+            in_reason += 1
+            if seen[abs(var)]:
+                continue
+            seen[abs(var)] = True
+            if level[abs(var)] == current_level:
+                pending += 1
+            else:
+                learned.append(var)
+
+        # Se todo literal do resolvente veio da razão, ele subsume a razão
+        # Só clausulas aprendidas longas são trocadas, e só enquanto restam
+        # dois literais do nível atual, que ficam indefinidos após o backjump
+        if (subsumed is not None and value != 0 and pending >= 2 and in_reason >= 3
+                and in_reason == len(learned) - 1 + pending
+                and data[reason_clause + ClauseArena.FLAGS] & ClauseArena.LEARNT):
+            resolvent = [var for var in data[start:start + data[reason_clause]]
+                         if var != value and level[abs(var)] > 0]
+            resolvent.sort(key=lambda var: -level[abs(var)])
+            subsumed.append((reason_clause, resolvent))
+
+        # Próximo valor marcado da pilha
+        while not seen[abs(decision_stack[i])]:
+            i -= 1
+        value = decision_stack[i]
+        reason_clause = reason[abs(value)]
+        seen[abs(value)] = False
+        i -= 1
+
+        pending -= 1
+        if pending == 0:
+            break
+
+    learned[0] = -value
+
+    # Minimização recursiva: os literais da clausula continuam marcados,
+    # e cada um que é implicado pelos demais sai da clausula
+    abstract = 0
+    for var in learned[1:]:
+        abstract |= 1 << (level[abs(var)] & 31)
+    marked = []
+    minimized = [learned[0]]
+    for var in learned[1:]:
+        if reason[abs(var)] is None or reason[abs(var)] == LAZY_REASON \
+                or not redundant(data, decision_stack, abs(var), abstract, marked):
+            minimized.append(var)
+
+    for var in learned:
+        seen[abs(var)] = False
+    for var in marked:
+        seen[var] = False
+    learned = minimized
+
+    backjump_level = 0
+    for i in range(1, len(learned)):
+        if level[abs(learned[i])] > backjump_level:
+            backjump_level = level[abs(learned[i])]
+            learned[1], learned[i] = learned[i], learned[1]
+
+    return learned, backjump_level
+
+# Verifica se a variável var, de um literal da clausula aprendida, tem valor
+# implicado pelos demais literais dela, seguindo as razões no grafo de implicação
+# Os literais da clausula estão marcados em seen, assim como as variáveis já
+# provadas redundantes, que ficam em marked para serem limpas depois
+# abstract tem um bit para cada nível da clausula: uma variável de um nível
+# fora dela, ou decidida, não pode ser implicada só pela clausula
+# Uma razão LAZY_REASON não é gerada só para o teste: a variável conta
+# como decidida
+def redundant(
+    data,
+    decision_stack: DecisionStack,
+    var: int,
+    abstract: int,
+    marked: list[int]
+) -> bool:
+    level = decision_stack.level
+    reason = decision_stack.reason
+    seen = decision_stack.seen
+
+    top = len(marked)
+    stack = [var]
+    while stack:
+        reason_clause = reason[stack.pop()]
+        start = reason_clause + ClauseArena.HEADER
+        for k in range(start, start + data[reason_clause]):
+            other = abs(data[k])
+            if seen[other] or level[other] == 0:
+                continue
+            if reason[other] is None or reason[other] == LAZY_REASON or not (1 << (level[other] & 31)) & abstract:
+                for marked_var in marked[top:]:
+                    seen[marked_var] = False
+                del marked[top:]
+                return False
+            seen[other] = True
+            stack.append(other)
+            marked.append(other)
+
+    return True
+
+# Troca uma clausula aprendida subsumida no explain pelo resolvente que a subsume
+# A arena não encolhe clausulas, então a antiga é apagada e a nova adicionada,
+# observando dois literais do nível atual (os primeiros do resolvente)
+# A antiga não é procurada nas listas de observação: o propagate descarta as
+# clausulas apagadas que encontra nelas. As razões marcadas UNWATCHED nem
+# estão nessas listas
+# Retorna a referência da nova clausula
+def strengthen(
+    clauses: ClauseArena,
+    cref: int,
+    literals: list[int],
+    decision_stack: DecisionStack,
+    watches: list[list[int]],
+    proof: Optional[DratWriter] = None
+):
+    lbd = len({decision_stack.level[abs(var)] for var in literals})
+    strengthened = clauses.add(literals, learnt=True, lbd=min(lbd, clauses.data[cref + ClauseArena.LBD]))
+    clauses.data[strengthened + ClauseArena.USED] = clauses.data[cref + ClauseArena.USED]
+    watches[literals[0]].append(strengthened)
+    watches[literals[1]].append(strengthened)
+    if proof is not None:
+        proof.add(literals)
+        proof.delete(clauses.literals(cref))
+    clauses.delete(cref)
+    return strengthened
 
 # Função que define o valor de uma variável
-# É chamada somente após a propagação
-# Se houver um conflito, retorna a clausula de conflito
-# Já passando pelo explain
-def set_propagating_value(
-    clauses: list[Clause],
+# A propagação das consequências fica a cargo de propagate()
+def set_value(
     variable_values: list[int],
-    decision_stack: list[tuple[int, bool]],
+    decision_stack: DecisionStack,
     value_to_set: int,
-    reason: Clause,
-    reverse_clauses: list[list[int]]
+    reason: Optional[int]
 ):
     variable_values[abs(value_to_set)] = value_to_set
-    decision_stack.append((value_to_set, reason))
-    for idx in reverse_clauses[abs(value_to_set)]:
-        clause = clauses[idx].set_literal(value_to_set)
+    decision_stack.level[abs(value_to_set)] = decision_stack.decision_level()
+    decision_stack.reason[abs(value_to_set)] = reason
+    decision_stack.append(value_to_set)
 
-    for clause in clauses:
-        solved = any([var == variable_values[abs(var)] for var in clause.watched_literals])
-        if not solved and len(clause.watched_literals) == 0:
-            return explain(decision_stack, set(iter(clause)))
-
-    return None
+# Passa a observar os dois primeiros literais da clausula
+# watches é indexado pelo próprio literal: índices negativos
+# caem na segunda metade da lista
+# Clausulas binárias vão para binaries, também indexado pelo literal:
+# quando ele fica falso, cada par (literal, cref) da sua lista é implicado,
+# com a razão já no par, sem visitar a clausula na arena
+def watch_clause(
+    clauses: ClauseArena,
+    cref: int,
+    watches: list[list[int]],
+    binaries: list[list[tuple[int, int]]]
+):
+    start = cref + ClauseArena.HEADER
+    first, second = clauses.data[start], clauses.data[start + 1]
+    if clauses.size(cref) == 2:
+        binaries[first].append((second, cref))
+        binaries[second].append((first, cref))
+    else:
+        watches[first].append(cref)
+        watches[second].append(cref)
 
 # Rotina de propagação
+# Visita somente as clausulas que observam um literal que acabou de ficar falso,
+# primeiro as implicações binárias e depois as clausulas longas
+# Com restrições de cardinalidade, o valor propagado é contado nas restrições
+# em que aparece, antes de tudo, para que os contadores sigam a cabeça de
+# propagação; as que atingem o limite tornam falsos os seus demais literais
+# Se houver um conflito, retorna a clausula de conflito (LAZY_REASON se ele
+# vier de uma restrição de cardinalidade)
 def propagate(
-    clauses: list[Clause],
+    clauses: ClauseArena,
     variable_values: list[int],
-    decision_stack: list[tuple[int, Optional[Clause]]],
-    reverse_clauses: list[list[int]]
+    decision_stack: DecisionStack,
+    watches: list[list[int]],
+    binaries: list[list[tuple[int, int]]],
+    cardinality: Optional[Cardinality] = None
 ):
-    # Enquanto houver variáveis a serem propagadas
-    while True:
-        value_to_set = None
-        reason_clause = None
-
-        for clause in clauses:
-            solved = any([var == variable_values[abs(var)] for var in clause.watched_literals])
-            if not solved and len(clause.watched_literals) == 0:
-                return explain(decision_stack, set(iter(clause)))
-
-            if not solved:
-                if len(clause.watched_literals) == 1:           # Encontramos uma clausula unitária
-                    value_to_set = clause.watched_literals[0]
-                    reason_clause = clause
-                    break
-                elif len(clause.watched_literals) == 0:         # Encontramos uma clausula sem solução
-                    return []
-
-        # Se não foi possível continuar a propagação, pare
-        if value_to_set is None:
-            break
+    data = clauses.data
+    header = ClauseArena.HEADER
+    flags = ClauseArena.FLAGS
+    deleted = ClauseArena.DELETED
 
-        # Defino o valor da variável
-        explanation = set_propagating_value(
-            clauses,
-            variable_values,
-            decision_stack,
-            value_to_set,
-            reason_clause,
-            reverse_clauses
-        )
+    # Enquanto houver valores a serem propagados
+    while decision_stack.head < len(decision_stack):
+        false_literal = -decision_stack[decision_stack.head]
+        decision_stack.head += 1
 
-        # Se ouver conflito, logo um explicação
-        if explanation is not None:
-            return explanation
+        if cardinality is not None and cardinality.occurs[-false_literal]:
+            for constraint in cardinality.count(-false_literal):
+                implied = cardinality.propagate(constraint, variable_values)
+                if implied is None:
+                    return LAZY_REASON
+                for literal in implied:
+                    set_value(variable_values, decision_stack, literal, LAZY_REASON)
+
+        for implied, cref in binaries[false_literal]:
+            implied_value = variable_values[abs(implied)]
+            if implied_value == implied:
+                continue
+            if implied_value == 0:
+                set_value(variable_values, decision_stack, implied, cref)
+            else:
+                return cref
+
+        watch_list = watches[false_literal]
+        kept = 0
+        for i in range(len(watch_list)):
+            cref = watch_list[i]
+
+            # Apagada pelo strengthen(), a clausula sai desta lista
+            if data[cref + flags] & deleted:
+                continue
+
+            # O literal observado foi trocado, a clausula sai desta lista
+            if set_literal(data, cref, false_literal, variable_values):
+                watches[data[cref + header + 1]].append(cref)
+                continue
+
+            watch_list[kept] = cref
+            kept += 1
+
+            first = data[cref + header]
+            first_value = variable_values[abs(first)]
+            if first_value == first:
+                continue
+
+            if first_value == 0:                            # Encontramos uma clausula unitária
+                set_value(variable_values, decision_stack, first, cref)
+            else:                                           # Encontramos uma clausula sem solução
+                watch_list[kept:] = watch_list[i + 1:]
+                return cref
+
+        del watch_list[kept:]
 
     return None
 
 # Função responsável pela decisão
-# Utiliza VSIDS para decidir
+# Utiliza VSIDS para decidir, retirando do heap a variável de maior score
+# Variáveis já definidas são descartadas, e voltam ao heap no backtrack
+# A variável recebe o último valor que teve (phase saving)
 def decide(
-    clauses: list[Clause],
     variable_values: list[int],
-    decision_stack: list[tuple[int, Optional[Clause]]],
-    reverse_clauses: list[list[int]],
-    score: list[float]
+    decision_stack: DecisionStack,
+    heap: VariableHeap
 ):
-    selected_var = None
-    for i in range(1, len(score)):
-        if variable_values[i] == 0 and (selected_var is None or score[i] > score[selected_var]):
-            selected_var = i
+    while len(heap) > 0:
+        selected_var = heap.pop()
+        if variable_values[selected_var] == 0:
+            decision_stack.level_starts.append(len(decision_stack))
+            set_value(variable_values, decision_stack, decision_stack.phase[selected_var], None)
+            return True
+
+    return False
+
+# Desfaz as atribuições dos níveis acima de backjump_level
+# Nenhuma clausula é visitada: as listas de observação
+# continuam válidas ao desfazer atribuições
+# Os valores já propagados saem dos contadores das restrições de cardinalidade
+def backtrack(
+    variable_values: list[int],
+    decision_stack: DecisionStack,
+    backjump_level: int,
+    heap: VariableHeap,
+    cardinality: Optional[Cardinality] = None
+):
+    if decision_stack.decision_level() <= backjump_level:
+        return
+
+    start = decision_stack.level_starts[backjump_level]
+    if cardinality is not None:
+        cardinality.uncount(decision_stack[start:decision_stack.head])
+    phase = decision_stack.phase
+    for value in decision_stack[start:]:
+        variable_values[abs(value)] = 0
+        phase[abs(value)] = value
+        heap.push(abs(value))
+
+    del decision_stack[start:]
+    del decision_stack.level_starts[backjump_level:]
+    decision_stack.head = start
+
+# Nível para o qual voltar num restart
+# Sem reuse_trail, volta ao nível 0. Com reuse_trail, mantém os níveis cuja
+# decisão tem score maior que a próxima variável a ser decidida, já que
+# eles seriam refeitos do mesmo jeito logo após o restart
+def restart_level(
+    variable_values: list[int],
+    decision_stack: DecisionStack,
+    heap: VariableHeap,
+    reuse_trail: bool
+):
+    if not reuse_trail:
+        return 0
+
+    while len(heap) > 0 and variable_values[heap.top()] != 0:
+        heap.pop()
+    if len(heap) == 0:
+        return 0
+
+    # Níveis vazios (suposições já verdadeiras) não têm decisão para comparar
+    next_activity = heap.activity[heap.top()]
+    for level, start in enumerate(decision_stack.level_starts):
+        if start == len(decision_stack):
+            return level
+        if heap.activity[abs(decision_stack[start])] < next_activity:
+            return level
+    return decision_stack.decision_level()
+
+# Adiciona uma clausula aprendida na arena e nas listas de observação
+# O LBD (número de níveis distintos) fica guardado no cabeçalho da clausula
+# Após o backjump ela é unitária, então já propaga o seu primeiro literal
+def add_explanation(
+    clauses: ClauseArena,
+    explanation: list[int],
+    variable_values: list[int],
+    decision_stack: DecisionStack,
+    watches: list[list[int]],
+    binaries: list[list[tuple[int, int]]]
+):
+    lbd = len({decision_stack.level[abs(var)] for var in explanation})
+    cref = clauses.add(explanation, learnt=True, lbd=lbd)
+    if len(explanation) > 1:
+        watch_clause(clauses, cref, watches, binaries)
+    set_value(variable_values, decision_stack, explanation[0], cref)
+    return cref
+
+# Remove metade das clausulas aprendidas, mantendo as "glue" e as que são
+# razão de algum valor na pilha. As demais são ordenadas pelo LBD,
+# e depois pelo último conflito em que foram usadas
+# As razões geradas pelos propagadores (UNWATCHED) não disputam lugar com
+# as aprendidas: ficam só enquanto são razão
+# As removidas saem das listas de observação, e quando a arena tem espaço
+# demais desperdiçado ela é compactada, atualizando as referências
+# (inclusive as guardadas nas implicações binárias)
+# Retorna a nova lista de clausulas aprendidas
+# Com uma prova DRAT, as clausulas removidas são registradas nela
+def reduce_learned(
+    clauses: ClauseArena,
+    learned: list[int],
+    variable_values: list[int],
+    decision_stack: DecisionStack,
+    watches: list[list[int]],
+    binaries: list[list[tuple[int, int]]],
+    proof: Optional[DratWriter] = None
+):
+    data = clauses.data
+    reason = decision_stack.reason
+
+    kept = []
+    candidates = []
+    removed = []
+    for cref in learned:
+        # Já trocada pela versão fortalecida (ver strengthen())
+        if clauses.deleted(cref):
+            continue
+        first = data[cref + ClauseArena.HEADER]
+        locked = reason[abs(first)] == cref and variable_values[abs(first)] == first
+        if locked or (data[cref + ClauseArena.LBD] <= GLUE_LBD and not clauses.unwatched(cref)):
+            kept.append(cref)
+        elif clauses.unwatched(cref):
+            removed.append(cref)
+        else:
+            candidates.append(cref)
+
+    candidates.sort(key=lambda cref: (data[cref + ClauseArena.LBD], -data[cref + ClauseArena.USED]))
+    kept.extend(candidates[:len(candidates) // 2])
+    removed.extend(candidates[len(candidates) // 2:])
+    for cref in removed:
+        if proof is not None:
+            proof.delete(clauses.literals(cref))
+        clauses.delete(cref)
+
+    if 2 * clauses.wasted > len(data):
+        moved = clauses.compact()
+        for var in range(len(reason)):
+            if reason[var] is not None and reason[var] != LAZY_REASON:
+                reason[var] = moved.get(reason[var])
+        for literal in range(len(watches)):
+            watches[literal] = [moved[cref] for cref in watches[literal] if cref in moved]
+            binaries[literal] = [(implied, moved[cref]) for implied, cref in binaries[literal] if cref in moved]
+        return [moved[cref] for cref in kept]
+
+    for literal in range(len(watches)):
+        watches[literal] = [cref for cref in watches[literal] if not clauses.deleted(cref)]
+        binaries[literal] = [(implied, cref) for implied, cref in binaries[literal] if not clauses.deleted(cref)]
+    return kept
+
+# O score inicial de cada variável é o seu número de ocorrências
+# Com um gerador aleatório, os empates são desfeitos aleatoriamente
+def setup_vsids(
+    clauses: ClauseArena,
+    num_variables: int,
+    decay: float,
+    rng: Optional[random.Random]
+):
+    heap = VariableHeap(num_variables, decay)
+    for cref in clauses:
+        for var in clauses.literals(cref):
+            heap.activity[abs(var)] += 1
+    if rng is not None:
+        for var in range(1, num_variables + 1):
+            heap.activity[var] += rng.random()
+    heap.build(range(1, num_variables + 1))
+    return heap
+
+# Importa clausulas aprendidas por outros processos (ver portfolio.py)
+# Só é chamada no nível 0, então literais falsos podem ser descartados
+# e clausulas satisfeitas ignoradas
+# Retorna False se alguma clausula ficar vazia (UNSAT)
+def import_clauses(
+    clauses: ClauseArena,
+    shared: list[tuple[list[int], int]],
+    variable_values: list[int],
+    decision_stack: DecisionStack,
+    watches: list[list[int]],
+    binaries: list[list[tuple[int, int]]],
+    learned: list[int]
+):
+    for literals, lbd in shared:
+        if any(variable_values[abs(var)] == var for var in literals):
+            continue
+        literals = [var for var in literals if variable_values[abs(var)] == 0]
+        if len(literals) == 0:
+            return False
+
+        cref = clauses.add(literals, learnt=True, lbd=min(lbd, len(literals)))
+        learned.append(cref)
+        if len(literals) == 1:
+            set_value(variable_values, decision_stack, literals[0], cref)
+        else:
+            watch_clause(clauses, cref, watches, binaries)
 
-    if selected_var is None:
-        return False
-    
-    for idx in reverse_clauses[selected_var]:
-        clauses[idx].set_literal(selected_var)
-    variable_values[selected_var] = selected_var
-    decision_stack.append((selected_var, None))
     return True
 
-def get_biggest_variable(clauses: list[Clause]):
-    res = 0
-    for clause in clauses:
-        for var in clause:
-            res = max(res, abs(var))
-    return res
-
-def setup_vsids(clauses: list[Clause], num_variables: int):
-    score = [0 for _ in range(num_variables + 1)]
-    for clause in clauses:
-        for var in clause:
-            score[abs(var)] += 1
-    return score
-
-def generate_reverse_clauses(clauses: list[Clause], num_variables: int):
-    reverse_clauses = [[] for _ in range(num_variables + 1)]
-    for i in range(len(clauses)):
-        for var in clauses[i]:
-            reverse_clauses[abs(var)].append(i)
-    return reverse_clauses
-
-def vsids_decay(score: list[float], num_variables: int):
-    decay = 0.95
-    for i in range(num_variables + 1):
-        score[i] *= decay
-
-def solve(clauses: list[Clause]):
-    num_variables = get_biggest_variable(clauses)
-
-    # Guarda os valores das variáveis
-    # Se 0, indefinida
-    # Se -i, negativa
-    # Se i, positiva
-    variable_values = [0 for _ in range(num_variables + 1)]
-    
-    # Guarda em que clausulas uma variável é presente
-    reverse_clauses = generate_reverse_clauses(clauses, num_variables)
-
-    # Score para a heurístice de VSIDS
-    score = setup_vsids(clauses, num_variables)
-
-    # Stack com os valores das variáveis
-    # Cada elemento é uma dupla. O primeiro elemento é o valor da variável.
-    # O segundo elemento pode ser None, ou uma Clausula
-    # Se for None, a variável assumiu o valor por conta de uma decisão
-    # Caso contrário, o valor foi assumido por propagação
-    # É guardada a cláusula que causou a propagação
-    # Para a operação de explain
-    decision_stack = []
-
-    iteration = 1
-    while True:
+# Resolvedor incremental, no estilo da interface IPASIR
+# O estado é mantido entre as chamadas de solve(): clausulas aprendidas,
+# scores do VSIDS e fases salvas continuam valendo nas próximas chamadas
+# add_clause() adiciona clausulas entre chamadas, e solve() aceita suposições
+# (assumptions), literais que são as primeiras decisões, um por nível
+# Após um SAT, val() dá o valor de um literal no modelo; após um UNSAT,
+# failed() diz se a suposição foi usada para provar a insatisfatibilidade
+#
+# restart escolhe a política de restarts (glucose, luby ou none)
+# reuse_trail mantém no restart os níveis que seriam refeitos
+# polarity é o valor inicial das variáveis (positive, negative ou random)
+# seed, se diferente de 0, desfaz empates do VSIDS aleatoriamente
+# decay é o fator de decaimento do VSIDS
+# share troca clausulas aprendidas com outros processos do portfólio
+# stats, se dado, recebe os contadores de todas as chamadas
+# proof, se dado, recebe a prova DRAT: clausulas aprendidas e removidas
+# local_search, se diferente de 0, é o número de flips das rajadas de busca
+# local do modo híbrido, que definem as fases salvas (ver _walk())
+# budget, se dado, limita os recursos de cada chamada de solve()
+# xor recupera as restrições XOR das clausulas e as propaga por eliminação
+# de Gauss-Jordan (ver _gauss())
+# cardinality, se diferente de 0, é o tempo (em segundos) da busca por
+# restrições "no máximo k" (at-most-k) nas clausulas, que são trocadas
+# por restrições nativas, propagadas por contadores
+class Solver:
+    def __init__(
+        self,
+        clauses: Optional[ClauseArena] = None,
+        restart: str = "glucose",
+        reuse_trail: bool = False,
+        polarity: str = "positive",
+        seed: int = 0,
+        decay: float = 0.95,
+        share=None,
+        stats: Optional[Statistics] = None,
+        proof: Optional[DratWriter] = None,
+        local_search: int = 0,
+        budget: Optional[Budget] = None,
+        xor: bool = False,
+        cardinality: float = 0
+    ):
+        self.clauses = clauses if clauses is not None else ClauseArena()
+        self.num_variables = self.clauses.num_variables
+        self.reuse_trail = reuse_trail
+        self.polarity = polarity
+        self.share = share
+        self.stats = stats if stats is not None else Statistics()
+        self.proof = proof
+        self.budget = budget
+        self.phase_rng = random.Random(seed)
+
+        # Guarda os valores das variáveis
+        # Se 0, indefinida
+        # Se -i, negativa
+        # Se i, positiva
+        self.variable_values = [0 for _ in range(self.num_variables + 1)]
+
+        # Guarda que clausulas observam cada literal,
+        # e as implicações das clausulas binárias
+        self.watches = [[] for _ in range(2 * self.num_variables + 1)]
+        self.binaries = [[] for _ in range(2 * self.num_variables + 1)]
+
+        # Heap de variáveis com score para a heurístice de VSIDS
+        rng = random.Random(seed) if seed != 0 else None
+        self.heap = setup_vsids(self.clauses, self.num_variables, decay, rng)
+
+        # Stack com os valores das variáveis
+        # Para cada variável guarda a clausula que causou a propagação
+        # (ou None, se o valor veio de uma decisão) para a operação de explain
+        # Também guarda o nível de decisão de cada variável
+        self.decision_stack = DecisionStack(self.num_variables)
+        self.decision_stack.phase = [self._initial_phase(var) for var in range(self.num_variables + 1)]
+
+        self.restart_policy = make_restart_policy(restart)
+
+        # Clausulas aprendidas, e quando reduzi-las
+        self.learned = []
+        self.next_reduce = FIRST_REDUCE
+        self.reduce_interval = FIRST_REDUCE
+
+        # Busca local do modo híbrido, criada na primeira rajada
+        # e refeita quando clausulas são adicionadas
+        self.local_search = local_search
+        self.walker = None
+        self.walks = 0
+        self.next_walk = 0
+
+        # Restrições XOR das clausulas originais, se houver
+        # Importado aqui para que o CDCL não dependa do NumPy
+        self.gauss = None
+        if xor:
+            from gauss import GaussEngine, find_xors
+
+            xors = find_xors(self.clauses)
+            if xors:
+                self.gauss = GaussEngine(xors)
+
+        # Restrições de cardinalidade das clausulas originais, se houver
+        # As clausulas substituídas saem de uma cópia da arena, compactada,
+        # para não alterar a formula de quem chamou
+        # cardinality_clauses guarda as clausulas já geradas a partir delas,
+        # pelos seus literais, para serem reaproveitadas
+        self.cardinality = None
+        self.cardinality_clauses = {}
+        if cardinality:
+            constraints, covered = find_cardinality(self.clauses, budget=cardinality)
+            if constraints:
+                self.cardinality = Cardinality(constraints, self.num_variables)
+                self.clauses = self.clauses.copy()
+                for cref in covered:
+                    self.clauses.delete(cref)
+                self.clauses.compact()
+
+        # inconsistent indica UNSAT sem nenhuma suposição, para sempre
+        self.inconsistent = False
+        self.model = None
+        self.failed_assumptions = set()
+        # Maior atribuição parcial vista num conflito, dada
+        # quando o orçamento acaba antes da resposta
+        self.partial = []
+
+        for cref in list(self.clauses):
+            self._attach(cref)
+
+    # Adiciona uma clausula ao problema, voltando ao nível 0
+    # Literais falsos no nível 0 são descartados, e clausulas satisfeitas ignoradas
+    # As variáveis da clausula ganham score, para serem decididas logo
+    def add_clause(self, literals: Iterable[int]):
+        literals = list(dict.fromkeys(literals))
+        self._reset()
+        if literals:
+            self._grow(max(abs(var) for var in literals))
+        if self.inconsistent:
+            return
 
-        if iteration % 10000 == 0:
-            vsids_decay(score, num_variables)
-
-        # Tentamos propagar, e verificamos se há conflito
-        explanation = propagate(clauses, variable_values, decision_stack, reverse_clauses)
-        if explanation is None:
-            # Se não houver conflito, decidimos
-            if not decide(clauses, variable_values, decision_stack, reverse_clauses, score):
-                # Se decidimos tudo que tinha para ser decidido, SAT!!! :)
-                return decision_stack
-        elif len(explanation) == 0: # Se a explicação for uma clausula vazia, UNSAT :(
+        variable_values = self.variable_values
+        if any(-var in literals for var in literals):
+            return
+        if any(variable_values[abs(var)] == var for var in literals):
+            return
+        literals = [var for var in literals if variable_values[abs(var)] == 0]
+
+        for var in literals:
+            self.heap.bump(abs(var))
+        self._attach(self.clauses.add(literals))
+        self.walker = None
+
+    # Resolve o problema supondo os literais de assumptions verdadeiros
+    # Retorna True se for satisfatível, False se não for, e None se o
+    # orçamento acabar antes (o motivo fica em budget.reason)
+    def solve(self, assumptions: Iterable[int] = ()) -> Optional[bool]:
+        assumptions = list(assumptions)
+        self._reset()
+        if assumptions:
+            self._grow(max(abs(var) for var in assumptions))
+        if self.budget is not None:
+            self.budget.start(self.stats)
+        result = False if self.inconsistent else self._search(assumptions)
+        if result is None:
             return None
-        else:
-            # Adicionamos a explicação nas outras clausulas
-            # Também precismaos atualizar o reverse_clauses e score
-            clauses.append(explanation)
-            for var in explanation:
-                reverse_clauses[abs(var)].append(len(clauses) - 1)
-                score[abs(var)] += 1
-
-            # Realiza backtrack
-            while len(decision_stack) > 0:
-                value, reason = decision_stack.pop()
-                variable_values[abs(value)] = 0
-
-                if -value in explanation:
-                    decision_stack.append((value, reason))
-                    variable_values[abs(value)] = value
-                    break
-
-                for clause in clauses:
-                    clause.unset_literal(value)
-            
-            # Realiza backtrack (acredito ser desnecessário)
-            while len(decision_stack) > 0:
-                value, reason = decision_stack.pop()
-                variable_values[abs(value)] = 0
-                for clause in clauses:
-                    clause.unset_literal(value)
-
-                if reason is None:
-                    decision_stack.append((-value, {}))
-                    variable_values[abs(value)] = -value
-                    for idx in reverse_clauses[abs(value)]:
-                        clauses[idx].set_literal(-value)
-                    break
-
-            # Se a stack de decisão ficar vazia, UNSAT :(
-            if len(decision_stack) == 0:
+        # A prova de UNSAT termina com a clausula vazia
+        if not result:
+            if self.inconsistent and self.proof is not None:
+                self.proof.add(())
+            return False
+        self.model = list(self.variable_values)
+        return True
+
+    # Valor do literal no último modelo: o próprio literal se verdadeiro,
+    # sua negação se falso, e 0 se a variável não tem valor
+    def val(self, literal: int) -> int:
+        if self.model is None:
+            raise ValueError("val() needs a satisfiable solve() call first")
+        if abs(literal) >= len(self.model):
+            return 0
+        value = self.model[abs(literal)]
+        if value == 0:
+            return 0
+        return literal if value == literal else -literal
+
+    # Se a suposição literal faz parte da explicação do último UNSAT
+    def failed(self, literal: int) -> bool:
+        return literal in self.failed_assumptions
+
+    # Volta ao nível 0, descartando o modelo, as suposições falhas
+    # e a atribuição parcial
+    def _reset(self):
+        backtrack(self.variable_values, self.decision_stack, 0, self.heap, self.cardinality)
+        self.model = None
+        self.failed_assumptions = set()
+        self.partial = []
+
+    def _initial_phase(self, var: int) -> int:
+        if self.polarity == "negative":
+            return -var
+        if self.polarity == "random":
+            return self.phase_rng.choice((var, -var))
+        return var
+
+    # Aumenta as estruturas para variáveis até num_variables
+    # A lista de observação é refeita, já que os literais negativos
+    # são indexados a partir do fim
+    def _grow(self, num_variables: int):
+        old = self.num_variables
+        if num_variables <= old:
+            return
+        self.num_variables = num_variables
+        missing = num_variables - old
+
+        watches = [[] for _ in range(2 * num_variables + 1)]
+        binaries = [[] for _ in range(2 * num_variables + 1)]
+        for var in range(1, old + 1):
+            watches[var] = self.watches[var]
+            watches[-var] = self.watches[-var]
+            binaries[var] = self.binaries[var]
+            binaries[-var] = self.binaries[-var]
+        self.watches = watches
+        self.binaries = binaries
+
+        self.variable_values.extend([0] * missing)
+        decision_stack = self.decision_stack
+        decision_stack.level.extend([0] * missing)
+        decision_stack.reason.extend([None] * missing)
+        decision_stack.seen.extend([False] * missing)
+        decision_stack.phase.extend(self._initial_phase(var) for var in range(old + 1, num_variables + 1))
+
+        self.heap.grow(num_variables)
+        for var in range(old + 1, num_variables + 1):
+            self.heap.push(var)
+
+        if self.cardinality is not None:
+            self.cardinality.grow(num_variables)
+
+    # Observa uma clausula nova da arena
+    # Clausulas unitárias não são observadas, seus valores são definidos no nível 0
+    def _attach(self, cref: int):
+        clauses = self.clauses
+        if clauses.size(cref) == 0:
+            self.inconsistent = True
+            return
+        if clauses.size(cref) > 1:
+            watch_clause(clauses, cref, self.watches, self.binaries)
+            return
+
+        value = clauses.data[cref + ClauseArena.HEADER]
+        if self.variable_values[abs(value)] == -value:
+            self.inconsistent = True
+        elif self.variable_values[abs(value)] == 0:
+            set_value(self.variable_values, self.decision_stack, value, cref)
+
+    # Rajada de busca local (probSAT) sobre as clausulas originais, partindo
+    # dos valores do nível 0 e das fases salvas das demais variáveis
+    # Cada rajada tem o dobro de flips da anterior
+    # A melhor atribuição encontrada vira a fase salva: se for um modelo,
+    # o CDCL o refaz sem conflitos, já que decide sempre pela fase
+    def _walk(self):
+        # Importado aqui para que o CDCL não dependa do NumPy
+        from local_search import ProbSAT
+
+        if self.walker is None:
+            self.walker = ProbSAT(self.clauses, seed=self.phase_rng.randrange(1 << 30))
+        walker = self.walker
+        phase = self.decision_stack.phase
+        values = [self.variable_values[var] or phase[var] for var in range(walker.num_variables + 1)]
+        walker.search(values, self.local_search << self.walks)
+        self.walks += 1
+        if walker.best is not None:
+            phase[1:len(walker.best)] = walker.best[1:]
+
+    # Propagação das restrições XOR, quando as clausulas não propagam mais nada
+    # Implicações e conflitos da eliminação viram clausulas aprendidas, que
+    # servem de razão no explain como as outras, com os literais falsos em
+    # ordem decrescente de nível
+    # Retorna a clausula de conflito, ou None
+    def _gauss(self):
+        decision_stack = self.decision_stack
+        level = decision_stack.level
+        conflict, implied = self.gauss.propagate(self.variable_values)
+        if conflict is not None:
+            conflict.sort(key=lambda var: -level[abs(var)])
+            # O explain parte dos literais do nível atual: se o conflito
+            # não tem nenhum, voltamos ao nível mais alto dele
+            if conflict and level[abs(conflict[0])] < decision_stack.decision_level():
+                backtrack(self.variable_values, decision_stack, level[abs(conflict[0])], self.heap, self.cardinality)
+            return self._add_reason(conflict)
+
+        for clause in implied:
+            clause[1:] = sorted(clause[1:], key=lambda var: -level[abs(var)])
+            set_value(self.variable_values, decision_stack, clause[0], self._add_reason(clause))
+        return None
+
+    # Adiciona uma clausula gerada pela eliminação de Gauss ou por uma
+    # restrição de cardinalidade às aprendidas
+    # Ela não é observada, já que a restrição a refaz quando preciso,
+    # e sai na próxima redução se não for mais razão (ver reduce_learned())
+    def _add_reason(self, literals: list[int]) -> int:
+        lbd = len({self.decision_stack.level[abs(var)] for var in literals})
+        cref = self.clauses.add(literals, learnt=True, lbd=lbd)
+        self.clauses.data[cref + ClauseArena.FLAGS] |= ClauseArena.UNWATCHED
+        self.learned.append(cref)
+        return cref
+
+    # Clausula de uma restrição de cardinalidade, de razão ou de conflito
+    # A mesma clausula é reaproveitada até ser removida, com o primeiro
+    # literal dado (o implicado) trazido para a primeira posição, onde o
+    # reduce_learned() procura o valor de que ela é razão
+    def _cardinality_clause(self, literals: list[int]) -> int:
+        key = frozenset(literals)
+        cref = self.cardinality_clauses.get(key)
+        if cref is None or self.clauses.deleted(cref):
+            cref = self._add_reason(literals)
+            self.cardinality_clauses[key] = cref
+            return cref
+
+        data = self.clauses.data
+        start = cref + ClauseArena.HEADER
+        if data[start] != literals[0]:
+            i = data.index(literals[0], start, start + data[cref])
+            data[start], data[i] = data[i], data[start]
+        return cref
+
+    # Gera a razão do valor da variável var, implicado por uma restrição de
+    # cardinalidade: o valor, e a negação dos literais verdadeiros que levaram
+    # a restrição ao limite
+    # A razão fica na pilha no lugar de LAZY_REASON, e é retornada
+    def _lazy_reason(self, var: int) -> int:
+        literals = [self.variable_values[var]]
+        literals.extend(-literal for literal in self.cardinality.explanations[var])
+        cref = self._cardinality_clause(literals)
+        self.decision_stack.reason[var] = cref
+        return cref
+
+    # Suposições que implicam a negação da suposição literal, que ficou falsa
+    # Percorre a pilha de cima para baixo seguindo as razões, como no explain,
+    # até chegar às decisões, que nesses níveis são todas suposições
+    def _analyze_final(self, literal: int):
+        decision_stack = self.decision_stack
+        failed = {literal}
+        if decision_stack.level[abs(literal)] == 0:
+            return failed
+
+        data = self.clauses.data
+        level = decision_stack.level
+        seen = decision_stack.seen
+        seen[abs(literal)] = True
+        for value in reversed(decision_stack[decision_stack.level_starts[0]:]):
+            if not seen[abs(value)]:
+                continue
+            seen[abs(value)] = False
+            reason_clause = decision_stack.reason[abs(value)]
+            if reason_clause is None:
+                failed.add(value)
+                continue
+            if reason_clause == LAZY_REASON:
+                reason_clause = self._lazy_reason(abs(value))
+            start = reason_clause + ClauseArena.HEADER
+            for k in range(start, start + data[reason_clause]):
+                var = data[k]
+                if var != value and level[abs(var)] > 0:
+                    seen[abs(var)] = True
+        return failed
+
+    # Laço principal do CDCL
+    # Retorna True se encontrar um modelo, False se provar UNSAT,
+    # com ou sem as suposições, e None se o orçamento acabar
+    def _search(self, assumptions: list[int]) -> Optional[bool]:
+        clauses = self.clauses
+        variable_values = self.variable_values
+        watches = self.watches
+        binaries = self.binaries
+        heap = self.heap
+        decision_stack = self.decision_stack
+        restart_policy = self.restart_policy
+        share = self.share
+        proof = self.proof
+        budget = self.budget
+        gauss = self.gauss
+        cardinality = self.cardinality
+        stats = self.stats
+        times = stats.times
+        clock = time.perf_counter
+
+        while True:
+            # O orçamento é verificado a cada passo, sem mexer na pilha:
+            # ela só volta ao nível 0 na próxima chamada
+            if budget is not None and budget.exhausted(stats):
+                if len(decision_stack) > len(self.partial):
+                    self.partial = list(decision_stack)
                 return None
 
-        iteration += 1
+            # Tentamos propagar, e verificamos se há conflito
+            head = decision_stack.head
+            start = clock()
+            conflict_clause = propagate(clauses, variable_values, decision_stack, watches, binaries, cardinality)
+            stats.propagations += decision_stack.head - head
+            if conflict_clause == LAZY_REASON:
+                conflict_clause = self._cardinality_clause(cardinality.conflict)
+            # Sem conflito, a eliminação de Gauss pode implicar mais valores,
+            # que são propagados nas clausulas antes de seguir
+            if conflict_clause is None and gauss is not None:
+                assigned = len(decision_stack)
+                conflict_clause = self._gauss()
+                if conflict_clause is None and len(decision_stack) > assigned:
+                    times["propagate"] += clock() - start
+                    continue
+            times["propagate"] += clock() - start
+            if conflict_clause is None:
+                if restart_policy is not None and restart_policy.should_restart():
+                    start = clock()
+                    level = restart_level(variable_values, decision_stack, heap, self.reuse_trail)
+                    backtrack(variable_values, decision_stack, level, heap, cardinality)
+                    times["backtrack"] += clock() - start
+                    restart_policy.restarted()
+                    stats.restarts += 1
 
+                if stats.conflicts >= self.next_reduce:
+                    size = len(self.learned)
+                    self.learned = reduce_learned(clauses, self.learned, variable_values, decision_stack, watches, binaries, proof)
+                    # As referências podem ter mudado na compactação
+                    self.cardinality_clauses.clear()
+                    stats.reductions += 1
+                    stats.deleted += size - len(self.learned)
+                    self.reduce_interval += REDUCE_INCREMENT
+                    self.next_reduce = stats.conflicts + self.reduce_interval
 
-def main():
-    clauses = load_file(sys.argv[1])
-    result = solve(clauses)
+                # No nível 0, importamos as clausulas dos outros processos
+                # Se alguma delas for unitária, é preciso propagar antes de decidir
+                if share is not None and decision_stack.decision_level() == 0:
+                    assigned = len(decision_stack)
+                    if not import_clauses(clauses, share.receive(), variable_values, decision_stack, watches, binaries, self.learned):
+                        self.inconsistent = True
+                        return False
+                    if len(decision_stack) > assigned:
+                        continue
+
+                # Rajadas de busca local no nível 0: no início,
+                # e depois de 1, 2, 4, 8... restarts
+                if self.local_search > 0 and decision_stack.decision_level() == 0 and stats.restarts >= self.next_walk:
+                    self._walk()
+                    self.next_walk = max(1, 2 * stats.restarts)
+
+                # As suposições são decididas primeiro, uma por nível
+                # Uma suposição já verdadeira ganha um nível vazio,
+                # e uma já falsa torna o problema UNSAT com essas suposições
+                level = decision_stack.decision_level()
+                if level < len(assumptions):
+                    literal = assumptions[level]
+                    if variable_values[abs(literal)] == -literal:
+                        self.failed_assumptions = self._analyze_final(literal)
+                        return False
+                    decision_stack.level_starts.append(len(decision_stack))
+                    if variable_values[abs(literal)] == 0:
+                        set_value(variable_values, decision_stack, literal, None)
+                    continue
+
+                # Se não houver conflito, decidimos
+                start = clock()
+                decided = decide(variable_values, decision_stack, heap)
+                times["decide"] += clock() - start
+                if not decided:
+                    # Se decidimos tudo que tinha para ser decidido, SAT!!! :)
+                    return True
+                stats.decisions += 1
+            else:
+                stats.conflicts += 1
+                if stats.conflicts >= stats.next_checkpoint:
+                    stats.checkpoint()
+                if budget is not None and len(decision_stack) > len(self.partial):
+                    self.partial = list(decision_stack)
+
+                start = clock()
+                subsumed = []
+                explanation, backjump_level = explain(clauses, decision_stack, conflict_clause, stats.conflicts, subsumed, self._lazy_reason)
+                if len(explanation) == 0: # Se a explicação for uma clausula vazia, UNSAT :(
+                    self.inconsistent = True
+                    return False
+                for cref, literals in subsumed:
+                    self.learned.append(strengthen(clauses, cref, literals, decision_stack, watches, proof))
+
+                # Precismaos atualizar o score, e decair todos os outros
+                for var in explanation:
+                    heap.bump(abs(var))
+                heap.decay_all()
+                times["analyze"] += clock() - start
+                stats.learned_clause(len(explanation), decision_stack.decision_level() - backjump_level)
+
+                # Realiza backjump para o segundo maior nível da explicação
+                # e adicionamos a explicação nas outras clausulas
+                start = clock()
+                backtrack(variable_values, decision_stack, backjump_level, heap, cardinality)
+                times["backtrack"] += clock() - start
+                cref = add_explanation(clauses, explanation, variable_values, decision_stack, watches, binaries)
+                self.learned.append(cref)
+                if proof is not None:
+                    proof.add(explanation)
+                if restart_policy is not None:
+                    restart_policy.on_conflict(clauses.data[cref + ClauseArena.LBD])
+                if share is not None:
+                    share.export(explanation, clauses.data[cref + ClauseArena.LBD])
+
+# Verifica um modelo, dado pelos literais verdadeiros, contra as clausulas
+# originais (as aprendidas são ignoradas)
+# Retorna a primeira clausula não satisfeita, ou None se o modelo for válido
+def check_model(clauses: ClauseArena, model: Iterable[int]):
+    values = [0 for _ in range(clauses.num_variables + 1)]
+    for var in model:
+        if abs(var) <= clauses.num_variables:
+            values[abs(var)] = var
+
+    for cref in clauses:
+        if clauses.learnt(cref):
+            continue
+        if not any(values[abs(var)] == var for var in clauses.literals(cref)):
+            return cref
+    return None
+
+# Resolve as clausulas uma única vez, com as opções de Solver
+# Retorna a pilha de decisão com o modelo se SAT, None se UNSAT, e
+# Unknown com a melhor atribuição parcial se o orçamento acabar
+def solve(clauses: ClauseArena, **options):
+    solver = Solver(clauses, **options)
+    result = solver.solve()
     if result is None:
+        return Unknown(solver.budget.reason, solver.partial)
+    if not result:
+        return None
+    return solver.decision_stack
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CDCL SAT solver")
+    parser.add_argument("filename", help="DIMACS CNF file, possibly .gz/.xz/.bz2")
+    parser.add_argument("--cache", metavar="DIR",
+                        help="keep the parsed formulas in DIR, to skip parsing on the next runs")
+    parser.add_argument("--restart", choices=RESTART_POLICIES, default="glucose",
+                        help="restart policy (default: glucose)")
+    parser.add_argument("--reuse-trail", action="store_true",
+                        help="keep the decision levels that would be redone on restart")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="simplify the formula before solving")
+    parser.add_argument("--preprocess-budget", type=float, default=1.0, metavar="SECONDS",
+                        help="time limit for the preprocessing (default: 1)")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="add symmetry-breaking clauses before solving")
+    parser.add_argument("--symmetry-budget", type=float, default=1.0, metavar="SECONDS",
+                        help="time limit for the symmetry search (default: 1)")
+    parser.add_argument("--xor", action="store_true",
+                        help="recover XOR constraints and propagate them with Gauss-Jordan elimination")
+    parser.add_argument("--cardinality", action="store_true",
+                        help="replace at-most-k constraints encoded as clauses by native ones")
+    parser.add_argument("--cardinality-budget", type=float, default=1.0, metavar="SECONDS",
+                        help="time limit for the search of at-most-k constraints (default: 1)")
+    parser.add_argument("--polarity", choices=POLARITIES, default="positive",
+                        help="initial value of the variables (default: positive)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="break VSIDS ties randomly with this seed (default: 0, no randomness)")
+    parser.add_argument("--decay", type=float, default=0.95,
+                        help="VSIDS decay factor (default: 0.95)")
+    parser.add_argument("--portfolio", type=int, default=1, metavar="N",
+                        help="solve with N diversified processes sharing learnt clauses")
+    parser.add_argument("--local-search", action="store_true",
+                        help="solve with probSAT local search only, which cannot prove UNSAT")
+    parser.add_argument("--max-flips", type=int, default=0, metavar="N",
+                        help="give up the local search after N flips, answering UNKNOWN (default: no limit)")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="seed the saved phases with bursts of local search")
+    parser.add_argument("--hybrid-flips", type=int, default=LOCAL_SEARCH_FLIPS, metavar="N",
+                        help=f"flips of each local search burst with --hybrid (default: {LOCAL_SEARCH_FLIPS})")
+    parser.add_argument("--conflicts", type=int, default=None, metavar="N",
+                        help="give up after N conflicts, answering UNKNOWN")
+    parser.add_argument("--propagations", type=int, default=None, metavar="N",
+                        help="give up after N propagations, answering UNKNOWN")
+    parser.add_argument("--time-limit", type=float, default=None, metavar="SECONDS",
+                        help="give up after SECONDS of search, answering UNKNOWN")
+    parser.add_argument("--memory-limit", type=int, default=None, metavar="MIB",
+                        help="give up when the process uses MIB of memory, answering UNKNOWN")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="print progress lines and statistics on stderr")
+    parser.add_argument("--progress-interval", type=int, default=1000, metavar="CONFLICTS",
+                        help="conflicts between progress lines with --verbose (default: 1000)")
+    parser.add_argument("--profile", type=int, default=0, metavar="CONFLICTS",
+                        help="profile the first CONFLICTS conflicts with cProfile")
+    parser.add_argument("--profile-output", metavar="FILE",
+                        help="save the profile to FILE instead of printing it")
+    parser.add_argument("--proof", metavar="FILE",
+                        help="write a DRAT proof of UNSAT answers to FILE")
+    parser.add_argument("--binary-proof", action="store_true",
+                        help="use the binary DRAT format")
+    parser.add_argument("--proof-thread", action="store_true",
+                        help="write the proof from a background thread")
+    args = parser.parse_args()
+
+    # A prova só vale para a formula original, resolvida num único processo
+    if args.proof and (args.preprocess or args.symmetry or args.xor or args.cardinality or args.portfolio > 1):
+        parser.error("--proof cannot be combined with --preprocess, --symmetry, --xor, --cardinality or --portfolio")
+    if args.local_search and (args.proof or args.portfolio > 1 or args.hybrid):
+        parser.error("--local-search cannot be combined with --proof, --portfolio or --hybrid")
+
+    # Com cache, a formula já lida antes não precisa ser lida de novo
+    if args.cache:
+        clauses = FormulaCache(args.cache).read(args.filename).clauses
+    else:
+        clauses = read_dimacs(args.filename)
+    original = clauses
+
+    # O preprocessamento pode já encontrar UNSAT (clauses None)
+    preprocessor = None
+    if args.preprocess:
+        preprocessor = Preprocessor(clauses, budget=args.preprocess_budget)
+        clauses = preprocessor.run()
+
+    # A quebra de simetrias adiciona clausulas, e variáveis auxiliares
+    # que são retiradas do modelo
+    breaker = None
+    if args.symmetry and clauses is not None:
+        breaker = SymmetryBreaker(clauses, budget=args.symmetry_budget)
+        clauses = breaker.run()
+        if args.verbose:
+            print(f"c symmetry generators: {len(breaker.generators)}", file=sys.stderr)
+
+    budget = Budget(
+        conflicts=args.conflicts,
+        propagations=args.propagations,
+        seconds=args.time_limit,
+        memory=args.memory_limit
+    )
+    options = dict(
+        restart=args.restart,
+        reuse_trail=args.reuse_trail,
+        polarity=args.polarity,
+        seed=args.seed,
+        decay=args.decay,
+        local_search=args.hybrid_flips if args.hybrid else 0,
+        budget=budget,
+        xor=args.xor,
+        cardinality=args.cardinality_budget if args.cardinality else 0
+    )
+    stats = Statistics(
+        progress_interval=args.progress_interval if args.verbose else 0,
+        profile_conflicts=args.profile,
+        profile_output=args.profile_output
+    )
+    proof = None
+    if args.proof:
+        proof = DratWriter.open(args.proof, binary=args.binary_proof, threaded=args.proof_thread)
+
+    # A busca local sozinha não prova UNSAT: sem modelo, a resposta é UNKNOWN
+    result = None
+    unknown = False
+    if clauses is not None and args.local_search:
+        from local_search import ProbSAT
+
+        walker = ProbSAT(clauses, seed=args.seed)
+        if walker.search(max_flips=args.max_flips or None):
+            result = walker.model()
+        else:
+            unknown = True
+        if args.verbose:
+            print(f"c flips: {walker.flips}, false clauses left: {walker.best_unsatisfied}", file=sys.stderr)
+    elif clauses is not None:
+        # SIGINT e SIGTERM interrompem o CDCL, que responde UNKNOWN
+        # Os processos do portfólio herdam o tratamento dos sinais
+        budget.handle_signals()
+        if args.portfolio > 1:
+            result = solve_portfolio(solve, clauses, args.portfolio, options)
+        else:
+            result = solve(clauses, stats=stats, proof=proof, **options)
+    if proof is not None:
+        proof.close()
+
+    # Estatísticas vão para stderr, para não misturar com a resposta
+    if args.verbose and args.portfolio <= 1 and not args.local_search:
+        stats.summary()
+    else:
+        stats.stop_profile()
+    if isinstance(result, Unknown):
+        unknown = True
+        if args.verbose:
+            print(f"c search stopped ({result.reason}), {len(result.partial)} variables assigned at best", file=sys.stderr)
+
+    if unknown:
+        print("UNKNOWN")
+    elif result is None:
         print("UNSATISFIABLE")
     else:
+        # Valores das variáveis eliminadas são reconstruídos
+        if breaker is not None:
+            result = breaker.project_model(result)
+        if preprocessor is not None:
+            result = preprocessor.extend_model(result)
+        falsified = check_model(original, result)
+        if falsified is not None:
+            sys.exit(f"c model check failed: clause {list(original.literals(falsified))} is not satisfied")
         print("SATISFIABLE")
-        for value, _ in result:
+        for value in result:
             print(value, end=" ")
         print()
 
@@ -0,0 +1,163 @@
+import multiprocessing
+import queue
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from arena import ClauseArena
+from budget import Unknown
+
+# learnt clauses are shared when they have at most SHARE_SIZE literals
+# or an LBD of at most SHARE_LBD
+SHARE_SIZE = 4
+SHARE_LBD = 2
+
+# ints in the shared ring buffer (4 MiB)
+RING_CAPACITY = 1 << 20
+
+# settings of the workers after the first one, which uses the given options
+DIVERSIFICATION = (
+    dict(restart="luby", polarity="negative", decay=0.9),
+    dict(restart="glucose", polarity="random", decay=0.85),
+    dict(restart="luby", polarity="positive", decay=0.99, reuse_trail=True),
+    dict(restart="glucose", polarity="negative", decay=0.9, reuse_trail=True),
+    dict(restart="none", polarity="random", decay=0.95),
+)
+
+
+class ClauseRing:
+    """
+    Ring buffer of learnt clauses in shared memory. Every worker appends
+    records [worker, lbd, size, literals...] and reads those of the others.
+    A reader that falls more than the capacity behind skips the lost records.
+    """
+
+    def __init__(self, context, capacity: int = RING_CAPACITY):
+        self.capacity = capacity
+        self.buffer = context.Array("i", capacity)
+        # total number of ints ever written
+        self.position = context.Value("q", 0, lock=False)
+
+    def write(self, worker: int, lbd: int, literals: List[int]):
+        record = [worker, lbd, len(literals)] + literals
+        if len(record) > self.capacity:
+            return
+        with self.buffer.get_lock():
+            start = self.position.value % self.capacity
+            end = start + len(record)
+            if end <= self.capacity:
+                self.buffer[start:end] = record
+            else:
+                split = self.capacity - start
+                self.buffer[start:] = record[:split]
+                self.buffer[:end - self.capacity] = record[split:]
+            self.position.value += len(record)
+
+    def read(self, worker: int, position: int) -> Tuple[List[Tuple[List[int], int]], int]:
+        """
+        Return the clauses of the other workers written since position,
+        with their LBD, and the new reading position.
+        """
+        clauses = []
+        with self.buffer.get_lock():
+            end = self.position.value
+            if end - position > self.capacity:
+                position = end
+            while position < end:
+                header = self._slice(position, 3)
+                literals = self._slice(position + 3, header[2])
+                if header[0] != worker:
+                    clauses.append((literals, header[1]))
+                position += 3 + header[2]
+        return clauses, position
+
+    def _slice(self, position: int, size: int) -> List[int]:
+        start = position % self.capacity
+        end = start + size
+        if end <= self.capacity:
+            return self.buffer[start:end]
+        return self.buffer[start:] + self.buffer[:end - self.capacity]
+
+
+class ClauseExchange:
+    """
+    One worker's end of the ring: what solve() calls to share clauses.
+    """
+
+    def __init__(self, ring: ClauseRing, worker: int):
+        self.ring = ring
+        self.worker = worker
+        self.position = ring.position.value
+
+    def export(self, literals: List[int], lbd: int):
+        if len(literals) <= SHARE_SIZE or lbd <= SHARE_LBD:
+            self.ring.write(self.worker, lbd, list(literals))
+
+    def receive(self) -> List[Tuple[List[int], int]]:
+        clauses, self.position = self.ring.read(self.worker, self.position)
+        return clauses
+
+
+def diversify(worker: int, options: Dict) -> Dict:
+    """
+    Return the solver options of a worker: the given ones for the first
+    worker, and a different mix of settings and seed for the others.
+    """
+    if worker == 0:
+        return dict(options)
+    diversified = dict(options)
+    diversified.update(DIVERSIFICATION[(worker - 1) % len(DIVERSIFICATION)])
+    diversified["seed"] = options.get("seed", 0) + worker
+    return diversified
+
+
+def _worker(solve: Callable, clauses: ClauseArena, worker: int, options: Dict, ring: ClauseRing, results):
+    result = solve(clauses, share=ClauseExchange(ring, worker), **options)
+    if result is not None and not isinstance(result, Unknown):
+        result = list(result)
+    results.put((worker, result))
+
+
+def solve_portfolio(
+    solve: Callable, clauses: ClauseArena, workers: int, options: Dict
+) -> Union[List[int], Unknown, None]:
+    """
+    Run workers diversified copies of solve() on the clauses, in separate
+    processes sharing short and low-LBD learnt clauses. Return the first
+    answer (None for UNSAT, else the true literals) and stop the others.
+    Workers that run out of their budget wait for the others, and if all of
+    them do, the Unknown with the largest partial assignment is returned.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    ring = ClauseRing(context)
+    results = context.Queue()
+
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(solve, clauses, worker, diversify(worker, options), ring, results),
+            daemon=True
+        )
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    unknown = []
+    try:
+        while True:
+            try:
+                _, result = results.get(timeout=0.1)
+                if not isinstance(result, Unknown):
+                    return result
+                unknown.append(result)
+                if len(unknown) == workers:
+                    return max(unknown, key=lambda result: len(result.partial))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError("all portfolio workers died without an answer")
+    finally:
+        # killed, as a worker whose budget handles SIGTERM would not stop
+        for process in processes:
+            process.kill()
+        for process in processes:
+            process.join()
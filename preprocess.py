@@ -0,0 +1,316 @@
+import time
+from collections import defaultdict
+from typing import Iterable, List, Optional, Set, Tuple
+
+from arena import ClauseArena
+
+# bounded variable elimination limits: variables with more occurrences
+# than this, or producing resolvents longer than this, are not eliminated
+ELIMINATION_OCCURRENCES = 16
+ELIMINATION_RESOLVENT_SIZE = 16
+
+# clauses longer than this are not used to subsume others
+SUBSUMPTION_CLAUSE_SIZE = 64
+
+# the deadline is checked every this many steps
+CHECK_INTERVAL = 256
+
+
+class Preprocessor:
+    """
+    CNF simplification before search: top-level unit propagation, pure
+    literal removal, backward subsumption and self-subsuming resolution,
+    bounded variable elimination and failed literal probing.
+
+    Clauses removed with a "witness" literal (pure literals and eliminated
+    variables) go to a reconstruction stack, which extend_model() replays to
+    turn a model of the simplified formula into one of the original formula.
+    Every step stops once the time budget (in seconds) is spent.
+    """
+
+    def __init__(self, clauses: ClauseArena, budget: float = 1.0):
+        self.num_variables = clauses.num_variables
+        self.budget = budget
+        self.deadline = 0.0
+        self.steps = 0
+        # the deadline is checked again once steps reaches next_check
+        self.next_check = CHECK_INTERVAL
+
+        # clause sets, None once removed, and occurrence lists of literals
+        self.clauses: List[Optional[Set[int]]] = []
+        self.occurs = defaultdict(set)
+
+        self.unsat = False
+        self.fixed: List[int] = []
+        self.values: Set[int] = set()
+        self.units: List[int] = []
+        self.eliminated: Set[int] = set()
+
+        # (witness literal, clause) pairs, in removal order
+        self.stack: List[Tuple[int, List[int]]] = []
+
+        for cref in clauses:
+            self._add(set(clauses.literals(cref)))
+
+    def run(self) -> Optional[ClauseArena]:
+        """
+        Simplify the formula. Return the simplified clauses, or None if the
+        formula was found unsatisfiable.
+        """
+        self.deadline = time.monotonic() + self.budget
+
+        for step in (self._pure_literals, self._subsume, self._eliminate, self._probe, self._subsume):
+            self._propagate()
+            if self.unsat:
+                return None
+            step()
+
+        self._propagate()
+        if self.unsat:
+            return None
+        return self.to_arena()
+
+    def to_arena(self) -> ClauseArena:
+        """
+        Return the current clauses, with the fixed literals as unit clauses.
+        """
+        clauses = ClauseArena()
+        for literal in self.fixed:
+            clauses.add((literal,))
+        for clause in self.clauses:
+            if clause is not None:
+                clauses.add(sorted(clause, key=abs))
+        return clauses
+
+    def extend_model(self, literals: Iterable[int]) -> List[int]:
+        """
+        Extend a model of the simplified formula, given as true literals,
+        to a model of the original formula over all its variables.
+        """
+        model = [False] * (self.num_variables + 1)
+        for literal in literals:
+            if abs(literal) <= self.num_variables:
+                model[abs(literal)] = literal > 0
+        for literal in self.fixed:
+            model[abs(literal)] = literal > 0
+
+        for witness, clause in reversed(self.stack):
+            if not any(model[abs(literal)] == (literal > 0) for literal in clause):
+                model[abs(witness)] = witness > 0
+
+        return [var if model[var] else -var for var in range(1, self.num_variables + 1)]
+
+    def _out_of_budget(self) -> bool:
+        # resolution and probing also count their steps, so the check is
+        # not tied to multiples of CHECK_INTERVAL
+        self.steps += 1
+        if self.steps < self.next_check:
+            return False
+        self.next_check = self.steps + CHECK_INTERVAL
+        return time.monotonic() > self.deadline
+
+    def _add(self, clause: Set[int]) -> Optional[int]:
+        """
+        Add a clause. Tautologies are dropped, and units are queued.
+        """
+        if any(-literal in clause for literal in clause):
+            return None
+        if any(literal in self.values for literal in clause):
+            return None
+        clause = {literal for literal in clause if -literal not in self.values}
+
+        if len(clause) == 0:
+            self.unsat = True
+            return None
+        if len(clause) == 1:
+            self.units.append(next(iter(clause)))
+
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        for literal in clause:
+            self.occurs[literal].add(index)
+        return index
+
+    def _remove(self, index: int):
+        for literal in self.clauses[index]:
+            self.occurs[literal].discard(index)
+        self.clauses[index] = None
+
+    def _strengthen(self, index: int, literal: int):
+        """
+        Remove a literal from a clause, queueing it if it becomes unit.
+        """
+        clause = self.clauses[index]
+        clause.discard(literal)
+        self.occurs[literal].discard(index)
+        if len(clause) == 0:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.units.append(next(iter(clause)))
+
+    def _propagate(self):
+        """
+        Assign the queued unit literals at the top level.
+        """
+        while self.units and not self.unsat:
+            literal = self.units.pop()
+            if literal in self.values:
+                continue
+            if -literal in self.values:
+                self.unsat = True
+                return
+
+            self.values.add(literal)
+            self.fixed.append(literal)
+            for index in list(self.occurs[literal]):
+                self._remove(index)
+            for index in list(self.occurs[-literal]):
+                self._strengthen(index, -literal)
+
+    def _pure_literals(self):
+        """
+        Satisfy literals whose negation does not occur, removing their clauses.
+        """
+        for var in range(1, self.num_variables + 1):
+            if self._out_of_budget():
+                return
+            for literal in (var, -var):
+                if self.occurs[literal] and not self.occurs[-literal]:
+                    for index in list(self.occurs[literal]):
+                        self.stack.append((literal, sorted(self.clauses[index], key=abs)))
+                        self._remove(index)
+
+    def _subsume(self):
+        """
+        Backward subsumption and self-subsuming resolution: every clause C
+        removes the clauses it subsumes, and removes the literal -l from the
+        clauses D such that C with l flipped subsumes D.
+        """
+        order = sorted(
+            (index for index, clause in enumerate(self.clauses)
+             if clause is not None and len(clause) <= SUBSUMPTION_CLAUSE_SIZE),
+            key=lambda index: len(self.clauses[index])
+        )
+        queue = list(reversed(order))
+        while queue and not self.unsat:
+            if self._out_of_budget():
+                return
+            index = queue.pop()
+            clause = self.clauses[index]
+            if clause is None:
+                continue
+
+            # candidates contain the literal of C with the fewest occurrences,
+            # or its negation
+            pivot = min(clause, key=lambda literal: len(self.occurs[literal]) + len(self.occurs[-literal]))
+            candidates = self.occurs[pivot] | self.occurs[-pivot]
+            for other in candidates:
+                if other == index:
+                    continue
+                target = self.clauses[other]
+                if target is None or len(target) < len(clause):
+                    continue
+
+                missing = [literal for literal in clause if literal not in target]
+                if len(missing) == 0:
+                    self._remove(other)
+                elif len(missing) == 1 and -missing[0] in target:
+                    self._strengthen(other, -missing[0])
+                    queue.append(other)
+            self._propagate()
+
+    def _eliminate(self):
+        """
+        Bounded variable elimination: replace the clauses of a variable by all
+        their non-tautological resolvents, if that does not add clauses.
+        """
+        candidates = sorted(
+            (var for var in range(1, self.num_variables + 1)
+             if self.occurs[var] or self.occurs[-var]),
+            key=lambda var: len(self.occurs[var]) * len(self.occurs[-var])
+        )
+        for var in candidates:
+            if self.unsat or self._out_of_budget():
+                return
+            self._propagate()
+            positive, negative = self.occurs[var], self.occurs[-var]
+            if var in self.eliminated or len(positive) + len(negative) > ELIMINATION_OCCURRENCES:
+                continue
+            if var in self.values or -var in self.values:
+                continue
+
+            resolvents = self._resolvents(var, len(positive) + len(negative))
+            if resolvents is None:
+                continue
+
+            self.eliminated.add(var)
+            for literal in (var, -var):
+                for index in list(self.occurs[literal]):
+                    self.stack.append((literal, sorted(self.clauses[index], key=abs)))
+                    self._remove(index)
+            for resolvent in resolvents:
+                self._add(resolvent)
+
+    def _resolvents(self, var: int, limit: int) -> Optional[List[Set[int]]]:
+        """
+        Return the non-tautological resolvents on var, or None if there are
+        more than limit of them or one is too long.
+        """
+        resolvents = []
+        for positive in self.occurs[var]:
+            for negative in self.occurs[-var]:
+                self.steps += 1
+                resolvent = (self.clauses[positive] | self.clauses[negative]) - {var, -var}
+                if any(-literal in resolvent for literal in resolvent):
+                    continue
+                if len(resolvent) > ELIMINATION_RESOLVENT_SIZE or len(resolvents) == limit:
+                    return None
+                resolvents.append(resolvent)
+        return resolvents
+
+    def _probe(self):
+        """
+        Failed literal probing: if assigning a literal leads to a conflict by
+        unit propagation, its negation is implied.
+        """
+        candidates = sorted(
+            (var for var in range(1, self.num_variables + 1)
+             if self.occurs[var] and self.occurs[-var]),
+            key=lambda var: -(len(self.occurs[var]) + len(self.occurs[-var]))
+        )
+        for var in candidates:
+            if self.unsat or self._out_of_budget():
+                return
+            if var in self.values or -var in self.values:
+                continue
+            for literal in (var, -var):
+                if self._failed(literal):
+                    self.units.append(-literal)
+                    self._propagate()
+                    break
+
+    def _failed(self, literal: int) -> bool:
+        """
+        Return whether unit propagation of literal reaches a conflict.
+        """
+        values = {literal}
+        queue = [literal]
+        while queue:
+            false_literal = -queue.pop()
+            for index in self.occurs[false_literal]:
+                self.steps += 1
+                unassigned = None
+                count = 0
+                for other in self.clauses[index]:
+                    if other in values or other in self.values:
+                        break
+                    if -other not in values and -other not in self.values:
+                        unassigned = other
+                        count += 1
+                else:
+                    if count == 0:
+                        return True
+                    if count == 1:
+                        values.add(unassigned)
+                        queue.append(unassigned)
+        return False
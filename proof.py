@@ -0,0 +1,100 @@
+import queue
+import threading
+from typing import BinaryIO, Iterable, Optional
+
+# bytes accumulated before the buffer is handed to the file
+BUFFER_SIZE = 1 << 20
+
+
+class DratWriter:
+    """
+    DRAT proof output: every learned clause is added as a lemma and every
+    deleted clause is recorded as a deletion, so that a checker such as
+    drat-trim can verify an UNSAT answer against the original formula.
+
+    The text format writes "l1 l2 ... 0" and "d l1 l2 ... 0" lines. The
+    binary format writes an "a" or "d" byte followed by each literal l as
+    the variable-length encoding of 2 * |l| + (l < 0), and a 0 byte.
+
+    Output goes into a buffer of buffer_size bytes. Full buffers are written
+    to the file directly or, if threaded, by a background thread, so the
+    solver does not wait for the disk.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        binary: bool = False,
+        threaded: bool = False,
+        buffer_size: int = BUFFER_SIZE,
+    ):
+        self.file = file
+        self.binary = binary
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+
+        self.queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+        if threaded:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._write_chunks, daemon=True)
+            self.thread.start()
+
+    @classmethod
+    def open(cls, filename: str, **options) -> "DratWriter":
+        return cls(open(filename, "wb"), **options)
+
+    def add(self, literals: Iterable[int]):
+        """
+        Record a lemma. The empty lemma ends a refutation.
+        """
+        self._clause(b"a" if self.binary else b"", literals)
+
+    def delete(self, literals: Iterable[int]):
+        self._clause(b"d" if self.binary else b"d ", literals)
+
+    def close(self):
+        """
+        Write what is left in the buffer and close the file.
+        """
+        self._flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.file.close()
+
+    def _clause(self, prefix: bytes, literals: Iterable[int]):
+        buffer = self.buffer
+        buffer += prefix
+        if self.binary:
+            for literal in literals:
+                code = 2 * literal if literal > 0 else 1 - 2 * literal
+                while code > 127:
+                    buffer.append(code & 127 | 128)
+                    code >>= 7
+                buffer.append(code)
+            buffer.append(0)
+        else:
+            for literal in literals:
+                buffer += b"%d " % literal
+            buffer += b"0\n"
+
+        if len(buffer) >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        if self.queue is not None:
+            self.queue.put(bytes(self.buffer))
+        else:
+            self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def _write_chunks(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                return
+            self.file.write(chunk)
@@ -0,0 +1,106 @@
+from typing import Optional
+
+RESTART_POLICIES = ("glucose", "luby", "none")
+
+
+def luby(i: int) -> int:
+    """
+    Return the i-th element (starting at 1) of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    x = i - 1
+    size, power = 1, 0
+    while size < x + 1:
+        size, power = 2 * size + 1, power + 1
+    while size - 1 != x:
+        size, power = (size - 1) // 2, power - 1
+        x %= size
+    return 1 << power
+
+
+class LubyRestarts:
+    """
+    Restart after unit * luby(k) conflicts, for k = 1, 2, 3, ...
+    """
+
+    __slots__ = ("unit", "index", "conflicts", "limit")
+
+    def __init__(self, unit: int = 100):
+        self.unit = unit
+        self.index = 1
+        self.conflicts = 0
+        self.limit = unit * luby(1)
+
+    def on_conflict(self, lbd: int):
+        self.conflicts += 1
+
+    def should_restart(self) -> bool:
+        return self.conflicts >= self.limit
+
+    def restarted(self):
+        self.index += 1
+        self.conflicts = 0
+        self.limit = self.unit * luby(self.index)
+
+
+class MovingAverage:
+    """
+    Exponential moving average, corrected for its zero initialization.
+    """
+
+    __slots__ = ("alpha", "value", "weight")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = 0.0
+        self.weight = 0.0
+
+    def update(self, x: float):
+        self.value += self.alpha * (x - self.value)
+        self.weight += self.alpha * (1.0 - self.weight)
+
+    def get(self) -> float:
+        return self.value / self.weight if self.weight > 0 else 0.0
+
+
+class GlucoseRestarts:
+    """
+    Glucose-style dynamic restarts: restart when the recent learnt clauses
+    are clearly worse (higher LBD) than the average over the whole run.
+    """
+
+    __slots__ = ("fast", "slow", "margin", "min_conflicts", "conflicts")
+
+    def __init__(self, margin: float = 1.25, min_conflicts: int = 50):
+        self.fast = MovingAverage(1 / 32)
+        self.slow = MovingAverage(1 / 4096)
+        self.margin = margin
+        self.min_conflicts = min_conflicts
+        self.conflicts = 0
+
+    def on_conflict(self, lbd: int):
+        self.conflicts += 1
+        self.fast.update(lbd)
+        self.slow.update(lbd)
+
+    def should_restart(self) -> bool:
+        return (
+            self.conflicts >= self.min_conflicts and
+            self.fast.get() > self.margin * self.slow.get()
+        )
+
+    def restarted(self):
+        self.conflicts = 0
+
+
+def make_restart_policy(name: str) -> Optional[object]:
+    """
+    Return the restart policy with the given name, None for "none".
+    """
+    if name == "glucose":
+        return GlucoseRestarts()
+    if name == "luby":
+        return LubyRestarts()
+    if name == "none":
+        return None
+    raise ValueError(f"unknown restart policy: {name}")
@@ -1,35 +1,3 @@
 #!/bin/bash
 
-commands=(
-    "python3 main.py pj1-tests/sat/block0.cnf"
-    "python3 main.py pj1-tests/sat/prime169.cnf"
-    "python3 main.py pj1-tests/sat/sqrt1042441.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0103.cnf"
-    "python3 main.py pj1-tests/sat/prime1849.cnf"
-    "python3 main.py pj1-tests/sat/sqrt10609.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0104.cnf"
-    "python3 main.py pj1-tests/sat/cnfgen-php-10-10.cnf"
-    "python3 main.py pj1-tests/sat/prime841.cnf"
-    "python3 main.py pj1-tests/sat/sqrt11449.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0105.cnf"
-    "python3 main.py pj1-tests/sat/elimredundant.cnf"
-    "python3 main.py pj1-tests/sat/prime961.cnf"
-    "python3 main.py pj1-tests/sat/uf20-01000.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0106.cnf"
-    "python3 main.py pj1-tests/sat/prime121.cnf"
-    "python3 main.py pj1-tests/sat/sat10.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0100.cnf"
-    "python3 main.py pj1-tests/sat/prime1369.cnf"
-    "python3 main.py pj1-tests/sat/sat12.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0101.cnf"
-    "python3 main.py pj1-tests/sat/prime1681.cnf"
-    "python3 main.py pj1-tests/sat/sqrt10201.cnf"
-    "python3 main.py pj1-tests/sat/uf20-0102.cnf"
-)
-
-for command in "${commands[@]}"; do
-    timeout 10 $command
-    if [ $? -eq 124 ]; then
-        echo "timeout"
-    fi
-done
+python3 batch.py pj1-tests/sat --timeout 10 --expected pj1-tests/expected.txt "$@"
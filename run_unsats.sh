@@ -1,36 +1,3 @@
 #!/bin/bash
 
-commands=(
-    "python3 main.py pj1-tests/unsat/add4.cnf"
-    "python3 main.py pj1-tests/unsat/elimclash.cnf"
-    "python3 main.py pj1-tests/unsat/unit7.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0151.cnf"
-    "python3 main.py pj1-tests/unsat/add8.cnf"
-    "python3 main.py pj1-tests/unsat/false.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-010.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0161.cnf"
-    "python3 main.py pj1-tests/unsat/cnfgen-parity-9.cnf"
-    "python3 main.py pj1-tests/unsat/full1.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0117.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0175.cnf"
-    "python3 main.py pj1-tests/unsat/cnfgen-peb-pyramid-20.cnf"
-    "python3 main.py pj1-tests/unsat/full3.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0120.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0182.cnf"
-    "python3 main.py pj1-tests/unsat/cnfgen-php-5-4.cnf"
-    "python3 main.py pj1-tests/unsat/full5.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-012.cnf"
-    "python3 main.py pj1-tests/unsat/cnfgen-ram-4-3-10.cnf"
-    "python3 main.py pj1-tests/unsat/full7.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0130.cnf"
-    "python3 main.py pj1-tests/unsat/cnfgen-tseitin-10-4.cnf"
-    "python3 main.py pj1-tests/unsat/ph6.cnf"
-    "python3 main.py pj1-tests/unsat/uuf100-0147.cnf"
-)
-
-for command in "${commands[@]}"; do
-    timeout 10 $command
-    if [ $? -eq 124 ]; then
-        echo "timeout"
-    fi
-done
+python3 batch.py pj1-tests/unsat --timeout 10 --expected pj1-tests/expected.txt "$@"
@@ -0,0 +1,136 @@
+import cProfile
+import pstats
+import sys
+import time
+from typing import Dict, Optional, TextIO
+
+# phases of the search whose time is measured
+PHASES = ("propagate", "analyze", "decide", "backtrack")
+
+COUNTERS = (
+    "decisions", "propagations", "conflicts", "restarts", "reductions",
+    "learned", "learned_literals", "deleted", "backjump_distance",
+)
+
+
+class Statistics:
+    """
+    Counters and phase timings of a solver run.
+
+    The solvers call checkpoint() whenever conflicts reaches next_checkpoint,
+    which prints a "c" progress line every progress_interval conflicts, and
+    stops the profiler started at construction after profile_conflicts
+    conflicts, printing its report or saving it to profile_output.
+    """
+
+    __slots__ = COUNTERS + (
+        "times", "start", "output", "progress_interval", "next_progress",
+        "profiler", "profile_conflicts", "profile_output", "next_checkpoint",
+    )
+
+    def __init__(
+        self,
+        progress_interval: int = 0,
+        profile_conflicts: int = 0,
+        profile_output: Optional[str] = None,
+        output: TextIO = sys.stderr,
+    ):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.start = time.perf_counter()
+        self.output = output
+
+        self.progress_interval = progress_interval
+        self.next_progress = progress_interval if progress_interval > 0 else float("inf")
+
+        self.profiler = None
+        self.profile_conflicts = profile_conflicts
+        self.profile_output = profile_output
+        if profile_conflicts > 0:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        self.next_checkpoint = min(self.next_progress, profile_conflicts or float("inf"))
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Return the counters, and the phase times as "<phase>_time".
+        """
+        result = {name: getattr(self, name) for name in COUNTERS}
+        for phase, seconds in self.times.items():
+            result[f"{phase}_time"] = seconds
+        return result
+
+    def learned_clause(self, size: int, distance: int):
+        """
+        Count a learned clause of size literals, after a backjump over
+        distance levels.
+        """
+        self.learned += 1
+        self.learned_literals += size
+        self.backjump_distance += distance
+
+    def checkpoint(self):
+        if self.conflicts >= self.next_progress:
+            self.progress()
+            self.next_progress += self.progress_interval
+        if self.profiler is not None and self.conflicts >= self.profile_conflicts:
+            self.stop_profile()
+        profile_end = self.profile_conflicts if self.profiler is not None else float("inf")
+        self.next_checkpoint = min(self.next_progress, profile_end)
+
+    def progress(self):
+        if self.conflicts == self.progress_interval:
+            self.output.write(
+                "c   conflicts   decisions  propagations  restarts   learned   deleted"
+                "  avg size     time\n"
+            )
+        self.output.write(
+            f"c {self.conflicts:11d} {self.decisions:11d} {self.propagations:13d} "
+            f"{self.restarts:9d} {self.learned:9d} {self.deleted:9d} "
+            f"{self._average(self.learned_literals, self.learned):9.1f} {self.elapsed():8.2f}\n"
+        )
+        self.output.flush()
+
+    def stop_profile(self):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        if self.profile_output is not None:
+            self.profiler.dump_stats(self.profile_output)
+        else:
+            self.output.write(f"c profile of the first {self.conflicts} conflicts:\n")
+            pstats.Stats(self.profiler, stream=self.output).sort_stats("cumulative").print_stats(25)
+        self.profiler = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def summary(self):
+        """
+        Print the final statistics as "c" lines, stopping the profiler if
+        it is still running.
+        """
+        self.stop_profile()
+        elapsed = self.elapsed()
+        lines = [
+            ("conflicts", f"{self.conflicts} ({self._average(self.conflicts, elapsed):.0f}/s)"),
+            ("decisions", f"{self.decisions} ({self._average(self.decisions, elapsed):.0f}/s)"),
+            ("propagations", f"{self.propagations} ({self._average(self.propagations, elapsed):.0f}/s)"),
+            ("restarts", f"{self.restarts}"),
+            ("learned clauses", f"{self.learned} (avg size {self._average(self.learned_literals, self.learned):.1f})"),
+            ("deleted clauses", f"{self.deleted} in {self.reductions} reductions"),
+            ("backjump distance", f"{self._average(self.backjump_distance, self.learned):.2f} levels on average"),
+        ]
+        for phase, seconds in self.times.items():
+            lines.append((f"{phase} time", f"{seconds:.3f}s ({100 * self._average(seconds, elapsed):.1f}%)"))
+        lines.append(("total time", f"{elapsed:.3f}s"))
+
+        for name, value in lines:
+            self.output.write(f"c {name:<18}: {value}\n")
+        self.output.flush()
+
+    @staticmethod
+    def _average(total: float, count: float) -> float:
+        return total / count if count else 0.0
@@ -0,0 +1,282 @@
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from arena import ClauseArena
+
+# the deadline is checked every this many clauses or nodes
+CHECK_INTERVAL = 4096
+
+# search nodes spent trying to extend a partial mapping to an automorphism
+MATCH_NODES = 64
+
+# variables of a generator's support covered by its lex-leader constraint
+LEX_LEADER_SIZE = 50
+
+
+class SymmetryBreaker:
+    """
+    Symmetry breaking before search: finds permutations of the literals
+    that map the set of clauses onto itself (variable permutations, possibly
+    combined with negations), and adds lex-leader constraints that keep, of
+    every orbit of assignments, only the lexicographically smallest ones.
+
+    The symmetries are the automorphisms of the literal-clause graph: a node
+    per literal and per clause, every literal joined to its negation and to
+    the clauses containing it. They are searched for by individualization
+    and refinement, as nauty does: colour refinement splits the nodes by
+    their neighbours' colours until the colouring is stable, and the first
+    path of the search tree individualizes a literal node at each level
+    until every literal has its own colour. At each level, from the deepest
+    up, the other nodes of the individualized cell are tried in its place,
+    and a leaf that matches the first one gives an automorphism. Nodes known
+    to be in the same orbit are skipped, and every candidate is checked
+    against the clauses before being used.
+
+    The constraints of the generators found follow the variable order: a
+    generator s requires x1..xk <= s(x1)..s(xk) (false < true) over the
+    first LEX_LEADER_SIZE variables it moves, with an auxiliary variable
+    per prefix meaning "equal so far". Building the graph and the search
+    stop once the time budget (in seconds) is spent, keeping the generators
+    already found.
+    """
+
+    def __init__(self, clauses: ClauseArena, budget: float = 1.0):
+        self.arena = clauses
+        self.num_variables = clauses.num_variables
+        self.num_literals = 2 * self.num_variables
+        self.budget = budget
+        self.deadline = 0.0
+
+        # the distinct original clauses, and the adjacency lists of the graph
+        self.clauses: List[List[int]] = []
+        self.clause_set: Set[frozenset] = set()
+        self.adjacency: List[List[int]] = []
+
+        # generators, as the image of every positive literal they move
+        self.generators: List[Dict[int, int]] = []
+        self.match_nodes = 0
+
+    def run(self) -> ClauseArena:
+        """
+        Find the symmetries and return the clauses with the lex-leader
+        constraints added, over new variables after the original ones, or
+        the clauses given, unchanged, if no symmetry was found.
+        """
+        self.deadline = time.monotonic() + self.budget
+        if self._build():
+            self._search()
+        if not self.generators:
+            return self.arena
+
+        clauses = ClauseArena()
+        for literals in self.clauses:
+            clauses.add(literals)
+        next_variable = self.num_variables + 1
+        for generator in self.generators:
+            next_variable = self._lex_leader(clauses, generator, next_variable)
+        return clauses
+
+    def project_model(self, literals: Iterable[int]) -> List[int]:
+        """
+        Drop the auxiliary variables from a model of the returned clauses.
+        """
+        return [literal for literal in literals if abs(literal) <= self.num_variables]
+
+    @staticmethod
+    def _node(literal: int) -> int:
+        return 2 * (abs(literal) - 1) + (literal < 0)
+
+    @staticmethod
+    def _literal(node: int) -> int:
+        var = (node >> 1) + 1
+        return -var if node & 1 else var
+
+    def _out_of_budget(self) -> bool:
+        return time.monotonic() > self.deadline
+
+    def _build(self) -> bool:
+        """
+        Build the literal-clause graph: literal nodes 2 * (var - 1) and
+        2 * (var - 1) + 1 (negative), then a node per distinct clause.
+        Return False if out of budget.
+        """
+        arena = self.arena
+        num_literals = self.num_literals
+        adjacency = self.adjacency
+        adjacency.extend([node ^ 1] for node in range(num_literals))
+        for i, cref in enumerate(arena):
+            if i % CHECK_INTERVAL == 0 and self._out_of_budget():
+                return False
+            if arena.learnt(cref):
+                continue
+            literals = frozenset(arena.literals(cref))
+            if literals in self.clause_set:
+                continue
+            self.clause_set.add(literals)
+            self.clauses.append(sorted(literals, key=abs))
+
+            node = len(adjacency)
+            members = [self._node(literal) for literal in literals]
+            adjacency.append(members)
+            for member in members:
+                adjacency[member].append(node)
+        return True
+
+    def _refine(self, colours: List[int]) -> Optional[List[int]]:
+        """
+        Colour refinement: split the colour classes by the multiset of the
+        neighbours' colours until no class splits. The new colours are the
+        ranks of the signatures, so that equivalent colourings of different
+        nodes get the same names. Return None if out of budget.
+        """
+        adjacency = self.adjacency
+        count = len(set(colours))
+        while True:
+            signatures = []
+            for first in range(0, len(adjacency), CHECK_INTERVAL):
+                if self._out_of_budget():
+                    return None
+                signatures.extend(
+                    (colours[node], tuple(sorted([colours[other] for other in adjacency[node]])))
+                    for node in range(first, min(first + CHECK_INTERVAL, len(adjacency)))
+                )
+            ranks = {signature: rank for rank, signature in enumerate(sorted(set(signatures)))}
+            colours = [ranks[signature] for signature in signatures]
+            if len(ranks) == count:
+                return colours
+            count = len(ranks)
+
+    @staticmethod
+    def _individualize(colours: List[int], node: int) -> List[int]:
+        colours = list(colours)
+        colours[node] = max(colours) + 1
+        return colours
+
+    def _target_cell(self, colours: List[int]) -> Optional[List[int]]:
+        """
+        The literal nodes of the non-singleton colour class of literals with
+        the smallest colour, None if every literal has its own colour.
+        """
+        cells: Dict[int, List[int]] = {}
+        for node in range(self.num_literals):
+            cells.setdefault(colours[node], []).append(node)
+        candidates = [colour for colour, cell in cells.items() if len(cell) > 1]
+        if not candidates:
+            return None
+        return cells[min(candidates)]
+
+    def _search(self):
+        colours = self._refine([0] * self.num_literals + [1] * len(self.clauses))
+        if colours is None:
+            return
+
+        # the first path: the colourings at each level, before the
+        # individualization of the first node of its target cell
+        path = []
+        while True:
+            cell = self._target_cell(colours)
+            if cell is None:
+                break
+            path.append((colours, cell))
+            colours = self._refine(self._individualize(colours, cell[0]))
+            if colours is None:
+                return
+        leaf = colours
+
+        # orbits of the literal nodes under the generators found, as a union-find
+        parent = list(range(self.num_literals))
+
+        def find(node: int) -> int:
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for level in reversed(range(len(path))):
+            colours, cell = path[level]
+            for node in cell[1:]:
+                if find(node) == find(cell[0]):
+                    continue
+                self.match_nodes = 0
+                images = self._match(self._individualize(colours, node), level + 1, path, leaf)
+                if images is False:
+                    return
+                if images is None:
+                    continue
+                self.generators.append({
+                    var: images[self._node(var)] for var in range(1, self.num_variables + 1)
+                    if images[self._node(var)] != var
+                })
+                for source in range(self.num_literals):
+                    a, b = find(source), find(self._node(images[source]))
+                    if a != b:
+                        parent[a] = b
+
+    def _match(self, colours: List[int], depth: int, path: list, leaf: List[int]):
+        """
+        Extend the individualizations of the first path up to depth - 1,
+        with colours as the last one, until a leaf that matches the first
+        one. Return the image of every literal node in the automorphism,
+        None if there is none, or False if out of budget.
+        """
+        colours = self._refine(colours)
+        if colours is None:
+            return False
+        target = path[depth][0] if depth < len(path) else leaf
+        if sorted(colours) != sorted(target):
+            return None
+
+        if depth == len(path):
+            nodes = {colours[node]: node for node in range(self.num_literals)}
+            images = [self._literal(nodes[leaf[node]]) for node in range(self.num_literals)]
+            return images if self._automorphism(images) else None
+
+        target_colour = path[depth][0][path[depth][1][0]]
+        for node in range(self.num_literals):
+            if colours[node] != target_colour:
+                continue
+            self.match_nodes += 1
+            if self.match_nodes > MATCH_NODES:
+                return None
+            images = self._match(self._individualize(colours, node), depth + 1, path, leaf)
+            if images is not None:
+                return images
+        return None
+
+    def _automorphism(self, images: List[int]) -> bool:
+        """
+        Whether the literal mapping commutes with negation and maps every
+        clause to a clause.
+        """
+        for node in range(0, self.num_literals, 2):
+            if images[node + 1] != -images[node]:
+                return False
+        for literals in self.clauses:
+            image = frozenset(images[self._node(literal)] for literal in literals)
+            if image not in self.clause_set:
+                return False
+        return True
+
+    @staticmethod
+    def _lex_leader(clauses: ClauseArena, generator: Dict[int, int], next_variable: int) -> int:
+        """
+        Add the lex-leader constraint of the generator, using auxiliary
+        variables from next_variable on, and return the next free one.
+        equal is the variable meaning "equal so far", None at the start.
+        """
+        equal = None
+        support = sorted(generator)[:LEX_LEADER_SIZE]
+        for i, var in enumerate(support):
+            image = generator[var]
+            prefix = [] if equal is None else [-equal]
+            # var <= image
+            clauses.add(prefix + [-var, image])
+            # var = -image can never be equal, so the constraint ends here
+            if image == -var or i == len(support) - 1:
+                break
+            following = next_variable
+            next_variable += 1
+            clauses.add(prefix + [-var, following])
+            clauses.add(prefix + [image, following])
+            equal = following
+        return next_variable
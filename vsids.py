@@ -0,0 +1,145 @@
+from typing import Iterable, List
+
+
+class VariableHeap:
+    """
+    Indexed binary max-heap of variables ordered by their EVSIDS activity.
+
+    Variables are integers in 1..num_variables. Bumping adds the current
+    increment to a variable's activity, and decaying grows the increment
+    instead of scaling every activity, so both are O(log n) or O(1).
+    """
+
+    __slots__ = ("activity", "increment", "decay", "heap", "indices")
+
+    # activities above this are scaled down together with the increment
+    RESCALE_LIMIT = 1e100
+
+    def __init__(self, num_variables: int, decay: float = 0.95):
+        self.activity: List[float] = [0.0] * (num_variables + 1)
+        self.increment = 1.0
+        self.decay = decay
+
+        self.heap: List[int] = []
+        # position of each variable in heap, -1 if not in the heap
+        self.indices: List[int] = [-1] * (num_variables + 1)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, variable: int) -> bool:
+        return self.indices[variable] >= 0
+
+    def grow(self, num_variables: int):
+        """
+        Make room for variables up to num_variables, with zero activity.
+        New variables are not inserted in the heap.
+        """
+        missing = num_variables + 1 - len(self.activity)
+        if missing > 0:
+            self.activity.extend([0.0] * missing)
+            self.indices.extend([-1] * missing)
+
+    def build(self, variables: Iterable[int]):
+        """
+        Replace the heap content by the given variables in O(n).
+        """
+        for variable in self.heap:
+            self.indices[variable] = -1
+        self.heap = list(variables)
+        for i, variable in enumerate(self.heap):
+            self.indices[variable] = i
+        for i in range(len(self.heap) // 2 - 1, -1, -1):
+            self._sift_down(i)
+
+    def push(self, variable: int):
+        """
+        Insert the variable, if it is not already in the heap.
+        """
+        if self.indices[variable] >= 0:
+            return
+        self.indices[variable] = len(self.heap)
+        self.heap.append(variable)
+        self._sift_up(len(self.heap) - 1)
+
+    def top(self) -> int:
+        """
+        Return the variable with the highest activity, without removing it.
+        """
+        return self.heap[0]
+
+    def pop(self) -> int:
+        """
+        Remove and return the variable with the highest activity.
+        """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        self.indices[top] = -1
+        if heap:
+            heap[0] = last
+            self.indices[last] = 0
+            self._sift_down(0)
+        return top
+
+    def bump(self, variable: int):
+        """
+        Increase the activity of the variable by the current increment.
+        """
+        activity = self.activity
+        activity[variable] += self.increment
+        if activity[variable] > self.RESCALE_LIMIT:
+            self.rescale()
+        if self.indices[variable] >= 0:
+            self._sift_up(self.indices[variable])
+
+    def decay_all(self):
+        """
+        Decay every activity, by making future bumps larger.
+        """
+        self.increment /= self.decay
+        if self.increment > self.RESCALE_LIMIT:
+            self.rescale()
+
+    def rescale(self):
+        """
+        Scale all activities and the increment down, keeping their order.
+        """
+        factor = 1.0 / self.RESCALE_LIMIT
+        activity = self.activity
+        for variable in range(len(activity)):
+            activity[variable] *= factor
+        self.increment *= factor
+
+    def _sift_up(self, i: int):
+        heap, indices, activity = self.heap, self.indices, self.activity
+        variable = heap[i]
+        score = activity[variable]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if activity[heap[parent]] >= score:
+                break
+            heap[i] = heap[parent]
+            indices[heap[i]] = i
+            i = parent
+        heap[i] = variable
+        indices[variable] = i
+
+    def _sift_down(self, i: int):
+        heap, indices, activity = self.heap, self.indices, self.activity
+        size = len(heap)
+        variable = heap[i]
+        score = activity[variable]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= score:
+                break
+            heap[i] = heap[child]
+            indices[heap[i]] = i
+            i = child
+        heap[i] = variable
+        indices[variable] = i